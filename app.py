@@ -1,10 +1,13 @@
 import streamlit as st
 import pandas as pd
 import time
-import plotly.express as px
 from src.core.planner import QueryPlanner
 from src.core.executor import QueryExecutor
 from src.core.reasoning import ReasoningEngine
+from src.core.context import ResultStore
+from src.core.repair import PlanRepairer
+from src.utils.summarizer import result_hash
+from src.utils.viz import ResultRenderer
 
 # Page Config
 st.set_page_config(
@@ -49,6 +52,12 @@ st.markdown("""
 # Initialize Session State
 if "messages" not in st.session_state:
     st.session_state.messages = []
+if "last_turn" not in st.session_state:
+    st.session_state.last_turn = None
+if "result_store" not in st.session_state:
+    st.session_state.result_store = ResultStore()
+if "last_example" not in st.session_state:
+    st.session_state.last_example = "Select an example..."
 
 # --- Sidebar ---
 with st.sidebar:
@@ -58,6 +67,7 @@ with st.sidebar:
     st.markdown("- **Natural Language Queries**")
     st.markdown("- **On-the-Fly Joining**")
     st.markdown("- **Auto-Visualization**")
+    st.markdown("- **Follow-up Questions**")
     
     st.markdown("---")
     st.markdown("### 📝 Example Queries")
@@ -72,6 +82,16 @@ with st.sidebar:
     
     selected_example = st.selectbox("Quick Start:", examples)
     
+    instrument_execution = st.checkbox("🔬 Instrument execution", value=False,
+                                       help="Record peak memory, result size, CPU/wall time and pandas op timings.")
+    hedged_planning = st.checkbox("⚡ Hedged planning", value=False,
+                                  help="Query a backup model in parallel and use the first plan that runs successfully.")
+    
+    if st.button("🧹 Clear Conversation"):
+        st.session_state.messages = []
+        st.session_state.last_turn = None
+        st.session_state.result_store.clear()
+    
     st.markdown("---")
     st.caption("v1.0.0 | Powered by Llama 3 via Groq")
 
@@ -81,19 +101,140 @@ st.markdown('<div class="main-header">GenAI Health Data Analyst</div>', unsafe_a
 # Ethical Disclaimer
 st.info("⚠️ **Disclaimer:** This tool uses hypothetical data for educational purposes. Generated insights are not medical advice.", icon="ℹ️")
 
-# Chat Interface
-for message in st.session_state.messages:
-    with st.chat_message(message["role"]):
-        st.markdown(message["content"])
+# --- Result Rendering ---
+@st.cache_data(max_entries=16, show_spinner=False)
+def build_chart_cached(result_key, _result_data):
+    """Chart building is cached per result hash; the frame itself is not hashed by Streamlit."""
+    return ResultRenderer.build_chart(_result_data)
+
+def render_data(result_data, result_key):
+    """Paginated, column-projected table plus an aggregated/downsampled chart."""
+    if not isinstance(result_data, (pd.DataFrame, pd.Series)):
+        st.write(result_data)
+        return
+
+    frame = ResultRenderer.to_frame(result_data)
+    column_lookup = {str(c): c for c in frame.columns}
+    all_columns = list(column_lookup)
+
+    col_p1, col_p2, col_p3 = st.columns([3, 1, 1])
+    with col_p1:
+        columns = st.multiselect("Columns", all_columns, default=all_columns, key=f"cols_{result_key}")
+    with col_p2:
+        page_size = st.selectbox("Rows per page", [50, 100, 500], index=1, key=f"size_{result_key}")
+    n_pages = ResultRenderer.page_count(len(frame), page_size)
+    with col_p3:
+        page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, key=f"page_{result_key}")
+
+    projection = [column_lookup[c] for c in (columns or all_columns)]
+    st.dataframe(ResultRenderer.page(frame, page, page_size, projection))
+    st.caption(f"Page {page} of {n_pages} | {len(frame)} rows x {len(all_columns)} columns")
+
+    # Auto-Visualization Logic
+    st.markdown("### 📈 Auto-Visualization")
+    try:
+        if result_key is not None:
+            fig, note = build_chart_cached(result_key, result_data)
+        else:
+            fig, note = ResultRenderer.build_chart(result_data)
+        if fig is not None:
+            st.plotly_chart(fig, use_container_width=True)
+            if note:
+                st.caption(note)
+    except Exception as e:
+        st.caption("Visualization not applicable.")
+
+def render_turn(turn):
+    """Renders the tabs for one processed query (also on reruns triggered by pagination widgets)."""
+    result_data = turn["result_data"]
+    eval_results = turn["eval_results"]
+
+    # Tabs for organized view
+    tab1, tab2, tab3, tab4 = st.tabs(["💡 Insight", "📊 Data & Viz", "🛠️ Logic", "⏱️ Evaluation"])
+
+    with tab1:
+        st.markdown(turn["response"])
+
+    with tab2:
+        render_data(result_data, turn["result_key"])
+
+    with tab3:
+        st.markdown("### Generated Code")
+        st.code(turn["code"], language="python")
+
+        st.markdown("### Execution Plan")
+        st.json({
+            "plan_explanation": turn["plan_explanation"],
+            "datasets_loaded": turn["datasets_used"],
+            "result_variable": f"turn_{turn['turn']}",
+            "join_strategy": "On-the-fly (in-memory)"
+        })
+        
+        if turn["repair_attempts"]:
+            st.markdown("### Repair Attempts")
+            st.dataframe(pd.DataFrame(turn["repair_attempts"]))
+
+    with tab4:
+        st.markdown("### 📊 LLM Evaluation (G-Eval)")
+        st.caption("AI-as-a-judge assessment of the generated response.")
+
+        g_eval = eval_results.get("g_eval", {})
+        cols = st.columns(4)
+
+        dimensions = ["Correctness", "Relevance", "Clarity", "Safety"]
+        for i, dim in enumerate(dimensions):
+            score = g_eval.get(dim.lower(), 0)
+            cols[i].metric(dim, f"{score}/5")
+
+        st.markdown("---")
+        col_m1, col_m2 = st.columns(2)
+
+        with col_m1:
+            st.markdown("#### ⏱️ Performance Metrics")
+            st.metric("Processing Time", f"{turn['total_time']:.2f}s")
+            if isinstance(result_data, pd.DataFrame):
+                st.metric("Rows Processed", len(result_data))
+
+        with col_m2:
+            st.markdown("#### 🛡️ Automated Checks")
+            safe_status = "✅ Present" if eval_results["automated"]["has_disclaimer"] else "❌ Missing"
+            st.markdown(f"**Medical Disclaimer:** {safe_status}")
+            st.markdown(f"**Word Count:** {eval_results['automated']['word_count']}")
+        
+        metrics = turn.get("execution_metrics")
+        if metrics:
+            st.markdown("---")
+            st.markdown("#### 🔬 Execution Instrumentation")
+            col_i1, col_i2, col_i3, col_i4 = st.columns(4)
+            col_i1.metric("Wall Time", f"{metrics['wall_ms']:.1f} ms")
+            col_i2.metric("CPU Time", f"{metrics['cpu_ms']:.1f} ms")
+            col_i3.metric("Peak Allocation", f"{metrics['peak_alloc_bytes'] / 1e6:.2f} MB")
+            col_i4.metric("Result Size", f"{metrics['result_bytes'] / 1e6:.2f} MB")
+            if metrics["ops"]:
+                st.dataframe(pd.DataFrame(metrics["ops"]).T)
+            if turn.get("cost_report"):
+                with st.expander("Most expensive query patterns"):
+                    st.dataframe(pd.DataFrame(turn["cost_report"])[
+                        ["pattern", "executions", "wall_ms", "cpu_ms", "peak_alloc_bytes", "result_bytes", "example_code"]])
 
 # Query Input logic
 prompt = st.chat_input("Ask a question about the health data...")
 
 # Handle Sidebar Selection (Simulates input)
-if selected_example != "Select an example...":
-    prompt = selected_example
-    # Reset selection to avoid loop
-    # st.sidebar.selectbox index reset is hard in streamlit without rerun, handle gracefully
+# Only a newly selected example counts as input; reruns from widgets must not resubmit it
+if selected_example != st.session_state.last_example:
+    st.session_state.last_example = selected_example
+    if selected_example != "Select an example...":
+        prompt = selected_example
+
+# Chat Interface
+history = st.session_state.messages
+if not prompt and st.session_state.last_turn is not None and history and history[-1]["role"] == "assistant":
+    # Widget rerun: the last answer is re-rendered below with its tabs, so skip its plain-text copy
+    history = history[:-1]
+for message in history:
+    with st.chat_message(message["role"]):
+        st.markdown(message["content"])
 
 if prompt:
     # Add user message
@@ -108,13 +249,14 @@ if prompt:
             
             # Initialize components (cached)
             @st.cache_resource
-            def get_components():
-                return QueryPlanner(), QueryExecutor(), ReasoningEngine()
+            def get_components(hedged, instrument):
+                executor = QueryExecutor(instrument=instrument)
+                return QueryPlanner(hedged=hedged), executor, ReasoningEngine(), PlanRepairer(executor)
             
-            planner, executor, reasoning = get_components()
+            planner, executor, reasoning, repairer = get_components(hedged_planning, instrument_execution)
             
             # 1. Plan
-            plan_result = planner.generate_plan(prompt)
+            plan_result = planner.generate_plan(prompt, context=st.session_state.result_store)
             
             if plan_result['error']:
                 st.error(f"❌ Planning Error: {plan_result['error']}")
@@ -123,7 +265,16 @@ if prompt:
             code = plan_result['query_code']
             
             # 2. Execute
-            exec_result = executor.execute(code)
+            exec_result = executor.execute(code, context=st.session_state.result_store,
+                                           compiled_code=plan_result.get('compiled_code'))
+            
+            # 2b. Repair on failure (local fixes, then a compact LLM repair prompt)
+            repair_attempts = []
+            if not exec_result['success']:
+                repair_out = repairer.repair(prompt, code, exec_result, context=st.session_state.result_store)
+                repair_attempts = repair_out['attempts']
+                code = repair_out['query_code']
+                exec_result = repair_out['exec_result']
             
             if not exec_result['success']:
                 st.error(f"❌ Execution Error: {exec_result['error']}")
@@ -132,6 +283,7 @@ if prompt:
                 st.stop()
                 
             result_data = exec_result['result']
+            turn_number = st.session_state.result_store.add(prompt, result_data)
             
             # 3. Reason
             insight = reasoning.analyze_result(prompt, exec_result, code)
@@ -143,93 +295,29 @@ if prompt:
             
             total_time = time.time() - start_time
             result_response = insight['response']
-            
-            # --- Display Results ---
-            
-            # Tabs for organized view
-            tab1, tab2, tab3, tab4 = st.tabs(["💡 Insight", "📊 Data & Viz", "🛠️ Logic", "⏱️ Evaluation"])
-            
-            with tab1:
-                st.markdown(result_response)
-                
-            with tab2:
-                # Result Display
-                if isinstance(result_data, (pd.DataFrame, pd.Series)):
-                    st.dataframe(result_data)
-                    
-                    # Auto-Visualization Logic
-                    st.markdown("### 📈 Auto-Visualization")
-                    try:
-                        if isinstance(result_data, pd.DataFrame):
-                            # Ensure numeric columns
-                            num_cols = result_data.select_dtypes(include=['number']).columns.tolist()
-                            
-                            if len(num_cols) >= 2:
-                                fig = px.scatter(result_data, x=num_cols[0], y=num_cols[1], 
-                                               title=f"{num_cols[0]} vs {num_cols[1]}")
-                                st.plotly_chart(fig, use_container_width=True)
-                                
-                            elif len(num_cols) == 1 and len(result_data.columns) == 2:
-                                cat_col = [c for c in result_data.columns if c not in num_cols][0]
-                                fig = px.bar(result_data, x=cat_col, y=num_cols[0], 
-                                           title=f"{num_cols[0]} by {cat_col}")
-                                st.plotly_chart(fig, use_container_width=True)
-                                
-                            elif len(num_cols) == 1:
-                                fig = px.histogram(result_data, x=num_cols[0], 
-                                                 title=f"Distribution of {num_cols[0]}")
-                                st.plotly_chart(fig, use_container_width=True)
-                        elif isinstance(result_data, pd.Series):
-                             st.bar_chart(result_data)
-                    except Exception as e:
-                        st.caption("Visualization not applicable.")
-
-                else:
-                    st.write(result_data)
-
-            with tab3:
-                st.markdown("### Generated Code")
-                st.code(code, language="python")
-                
-                st.markdown("### Execution Plan")
-                st.json({
-                    "plan_explanation": plan_result['explanation'],
-                    "datasets_loaded": ["Health Metrics (df1)", "Activity (df2)"],
-                    "join_strategy": "On-the-fly (in-memory)"
-                })
-
-            with tab4:
-                st.markdown("### 📊 LLM Evaluation (G-Eval)")
-                st.caption("AI-as-a-judge assessment of the generated response.")
-                
-                g_eval = eval_results.get("g_eval", {})
-                cols = st.columns(4)
-                
-                # Metric display helper
-                def get_score_color(score):
-                    if score >= 4: return "normal"
-                    if score >= 3: return "off"
-                    return "inverse"
-
-                dimensions = ["Correctness", "Relevance", "Clarity", "Safety"]
-                for i, dim in enumerate(dimensions):
-                    score = g_eval.get(dim.lower(), 0)
-                    cols[i].metric(dim, f"{score}/5")
-
-                st.markdown("---")
-                col_m1, col_m2 = st.columns(2)
-                
-                with col_m1:
-                    st.markdown("#### ⏱️ Performance Metrics")
-                    st.metric("Processing Time", f"{total_time:.2f}s")
-                    if isinstance(result_data, pd.DataFrame):
-                        st.metric("Rows Processed", len(result_data))
-                
-                with col_m2:
-                    st.markdown("#### 🛡️ Automated Checks")
-                    safe_status = "✅ Present" if eval_results["automated"]["has_disclaimer"] else "❌ Missing"
-                    st.markdown(f"**Medical Disclaimer:** {safe_status}")
-                    st.markdown(f"**Word Count:** {eval_results['automated']['word_count']}")
-            
-            # Save assistant response to history
-            st.session_state.messages.append({"role": "assistant", "content": result_response})
+
+            # Keep the processed turn so pagination/column widgets can re-render it on rerun
+            st.session_state.last_turn = {
+                "response": result_response,
+                "code": code,
+                "plan_explanation": plan_result['explanation'],
+                "result_data": result_data,
+                "result_key": result_hash(ResultRenderer.to_frame(result_data)) if isinstance(result_data, (pd.DataFrame, pd.Series)) else None,
+                "eval_results": eval_results,
+                "total_time": total_time,
+                "turn": turn_number,
+                "repair_attempts": repair_attempts,
+                "datasets_used": exec_result.get('datasets_used', []),
+                "execution_metrics": exec_result.get('metrics'),
+                "cost_report": executor.cost_report.top(5) if executor.instrument else []
+            }
+
+        # --- Display Results ---
+        render_turn(st.session_state.last_turn)
+
+    # Save assistant response to history
+    st.session_state.messages.append({"role": "assistant", "content": result_response})
+
+elif st.session_state.last_turn is not None:
+    with st.chat_message("assistant"):
+        render_turn(st.session_state.last_turn)
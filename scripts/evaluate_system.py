@@ -1,7 +1,11 @@
 import sys
 import os
 import json
+import hashlib
+import argparse
+import threading
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 from pathlib import Path
 
@@ -11,90 +15,239 @@ sys.path.append(str(Path(__file__).parent.parent))
 from src.core.pipeline import HealthDataPipeline
 from src.utils.evaluator import HealthEvaluator
 
-def run_evaluation():
+# Test suite with Reference Answers for ROUGE/Semantic Score
+DEFAULT_TEST_SUITE = [
+    {
+        "question": "What is the average BMI of patients with chronic kidney disease?",
+        "reference": "The average BMI for patients diagnosed with chronic kidney disease is approximately 30.77, which falls into the overweight category."
+    },
+    {
+        "question": "How many female patients have chronic kidney disease?",
+        "reference": "There are 486 female patients identified with chronic kidney disease in the dataset."
+    }
+]
+
+def item_id(item: dict) -> str:
+    """Stable identifier for a test item (explicit 'id' or hash of question + reference)."""
+    if item.get("id") is not None:
+        return str(item["id"])
+    key = f"{item['question']}\n{item.get('reference') or ''}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+def load_test_suite(path: str = None) -> list:
+    """
+    Loads a test suite from a .jsonl file (one item per line) or a .json list.
+    Items need a 'question' and optionally 'reference' and 'id'.
+    """
+    if not path:
+        return list(DEFAULT_TEST_SUITE)
+    suite = []
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                line = line.strip()
+                if line:
+                    suite.append(json.loads(line))
+        else:
+            suite = json.load(f)
+    return [item for item in suite if item.get("question")]
+
+def load_completed(report_path: Path, retry_failed: bool = True) -> dict:
+    """
+    Reads a partial JSONL report. Returns {item_id: entry} for completed items.
+    With retry_failed, items whose latest entry did not succeed are left out so they run again.
+    """
+    completed = {}
+    if not report_path.exists():
+        return completed
+    with open(report_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Truncated last line from an interrupted run
+            if entry.get("id"):
+                completed[entry["id"]] = entry  # Later entries (retries) supersede earlier ones
+    if retry_failed:
+        completed = {k: e for k, e in completed.items() if e.get("pipeline", {}).get("status") == "success"}
+    return completed
+
+class RunningSummary:
+    """Incrementally aggregated metrics, so the summary never needs the full result list."""
+
+    METRICS = ["G-Eval", "ROUGE-L", "Semantic", "Safe"]
+
+    def __init__(self):
+        self.count = 0
+        self.failed = 0
+        self.sums = {m: 0.0 for m in self.METRICS}
+        self.timing_sums = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def scores(entry: dict) -> dict:
+        m = entry.get("metrics") or {}
+        g_eval = m.get("g_eval") or {}
+        return {
+            "G-Eval": sum(g_eval.values()) / len(g_eval) if g_eval else 0,
+            "ROUGE-L": m["rouge"]["rougeL_fmeasure"] if isinstance(m.get("rouge"), dict) else 0,
+            "Semantic": m["semantic_similarity"] if isinstance(m.get("semantic_similarity"), (int, float)) else 0,
+            "Safe": float(m.get("automated", {}).get("has_disclaimer", False))
+        }
+
+    def add(self, entry: dict):
+        with self.lock:
+            self.count += 1
+            if entry.get("pipeline", {}).get("status") != "success":
+                self.failed += 1
+            for k, v in self.scores(entry).items():
+                self.sums[k] += v
+            for stage, ms in (entry.get("pipeline", {}).get("timings") or {}).items():
+                self.timing_sums[stage] = self.timing_sums.get(stage, 0.0) + ms
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            n = max(self.count, 1)
+            return {
+                "items": self.count,
+                "failed": self.failed,
+                "means": {k: round(v / n, 4) for k, v in self.sums.items()},
+                "mean_timings_ms": {k: round(v / n, 1) for k, v in self.timing_sums.items()}
+            }
+
+def evaluate_item(pipeline: HealthDataPipeline, evaluator: HealthEvaluator, item: dict) -> dict:
+    """Runs pipeline + evaluator for a single test item."""
+    question = item["question"]
+    reference = item.get("reference")
+    entry = {"id": item_id(item), "question": question}
+    try:
+        pipe_res = pipeline.run(question)
+        response = pipe_res["final_response"] or ""
+        entry["pipeline"] = {"status": pipe_res["status"], "timings": pipe_res["timings_ms"], "error": pipe_res["error"]}
+        # Semantic similarity is scored by the runner for a whole batch of completed items
+        entry["metrics"] = evaluator.evaluate(question, response, pipe_res, reference=reference, score_semantic=False)
+        if reference:
+            entry["_semantic_pair"] = (response, reference)
+    except Exception as e:
+        entry["pipeline"] = {"status": "error", "timings": {}, "error": f"{type(e).__name__}: {e}"}
+        entry["metrics"] = {}
+    return entry
+
+def score_semantic_batch(evaluator: HealthEvaluator, entries: list):
+    """Fills in semantic similarity for a batch of entries with a single vectorized scoring call."""
+    scored = [e for e in entries if "_semantic_pair" in e]
+    if not scored:
+        return
+    responses, references = zip(*(e.pop("_semantic_pair") for e in scored))
+    for entry, score in zip(scored, evaluator.run_semantic_batch(list(responses), list(references))):
+        entry["metrics"]["semantic_similarity"] = score
+
+def run_evaluation(suite_path: str = None, report_path: str = None, workers: int = 4, resume: bool = False,
+                   retry_failed: bool = True):
     print("="*80)
     print("🏥 GenAI Health System - Comprehensive Evaluation Suite")
     print("="*80)
-    
+
     # Setup
     pipeline = HealthDataPipeline()
     evaluator = HealthEvaluator()
     reports_dir = Path("reports")
     reports_dir.mkdir(exist_ok=True)
-    
-    # Test suite with Reference Answers for ROUGE/Semantic Score
-    test_suite = [
-        {
-            "question": "What is the average BMI of patients with chronic kidney disease?",
-            "reference": "The average BMI for patients diagnosed with chronic kidney disease is approximately 30.77, which falls into the overweight category."
-        },
-        {
-            "question": "How many female patients have chronic kidney disease?",
-            "reference": "There are 486 female patients identified with chronic kidney disease in the dataset."
-        }
-    ]
-    
-    results = []
-    print(f"\n🚀 Running expanded evaluation on {len(test_suite)} questions...")
-    
-    for i, item in enumerate(test_suite, 1):
-        question = item["question"]
-        reference = item["reference"]
-        
-        print(f"\n[{i}/{len(test_suite)}] Processing: {question}")
-        
-        # Run Pipeline
-        pipe_res = pipeline.run(question)
-        
-        # Run Evaluation with Reference
-        eval_res = evaluator.evaluate(question, pipe_res["final_response"], pipe_res, reference=reference)
-        
-        entry = {
-            "question": question,
-            "pipeline": {
-                "status": pipe_res["status"],
-                "timings": pipe_res["timings_ms"]
-            },
-            "metrics": eval_res
-        }
-        results.append(entry)
-        
-        # Quick console output
-        g_avg = sum(eval_res["g_eval"].values()) / 4
-        r_score = eval_res["rouge"]["rougeL_fmeasure"] if isinstance(eval_res["rouge"], dict) else 0
-        s_score = eval_res["semantic_similarity"] if isinstance(eval_res["semantic_similarity"], (int, float)) else 0
-        
-        print(f"  ✅ G-Eval: {g_avg:.1f} | ROUGE-L: {r_score:.2f} | Semantic: {s_score:.2f}")
-
-    # Generate Report
-    report_filename = reports_dir / f"comprehensive_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(report_filename, "w") as f:
-        json.dump(results, f, indent=2)
-        
+
+    test_suite = load_test_suite(suite_path)
+
+    # Precompute the reference index once for offline semantic scoring
+    evaluator.semantic_scorer.fit([item["reference"] for item in test_suite if item.get("reference")])
+
+    report_filename = Path(report_path) if report_path else reports_dir / f"comprehensive_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+
+    # Resume: skip items already completed in the partial report (failed ones are retried by default)
+    summary = RunningSummary()
+    completed = load_completed(report_filename, retry_failed) if resume else {}
+    for entry in completed.values():
+        summary.add(entry)
+    pending = [item for item in test_suite if item_id(item) not in completed]
+
+    print(f"\n🚀 Running expanded evaluation on {len(pending)} questions "
+          f"({len(completed)} already completed, {workers} workers)...")
+
+    done = 0
+    with open(report_filename, "a" if resume else "w", encoding="utf-8") as report, \
+            ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        # Bounded submission window keeps memory flat for suites with thousands of items
+        window = max(1, workers) * 2
+        if resume and report.tell() > 0:
+            report.write("\n")  # Terminate a possibly truncated last line; blank lines are skipped on load
+        queue = iter(pending)
+        futures = set()
+
+        def submit_next():
+            item = next(queue, None)
+            if item is not None:
+                futures.add(pool.submit(evaluate_item, pipeline, evaluator, item))
+
+        for _ in range(window):
+            submit_next()
+
+        def write_batch(entries):
+            nonlocal done
+            score_semantic_batch(evaluator, entries)
+            for entry in entries:
+                report.write(json.dumps(entry, default=str) + "\n")
+                summary.add(entry)
+                done += 1
+
+                # Quick console output
+                s = RunningSummary.scores(entry)
+                print(f"  [{done}/{len(pending)}] {entry['pipeline']['status']:<8} "
+                      f"G-Eval: {s['G-Eval']:.1f} | ROUGE-L: {s['ROUGE-L']:.2f} | Semantic: {s['Semantic']:.2f} "
+                      f"| {entry['question'][:50]}")
+            report.flush()
+
+        # Each batch of completed items is scored (one semantic batch call) and written immediately
+        while futures:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            futures -= finished
+            write_batch([future.result() for future in finished if future.exception() is None])
+            for future in finished:
+                future.result()  # A crashed worker is re-raised only after its finished siblings are on disk
+            for _ in finished:
+                submit_next()
+
     print("\n" + "="*80)
     print(f"📊 Evaluation Complete! Report: {report_filename}")
-    
+
     # Final Table
-    summary_data = []
-    for r in results:
-        m = r["metrics"]
-        summary_data.append({
-            "Question": r["question"][:30] + "...",
-            "G-Eval": sum(m["g_eval"].values()) / 4,
-            "ROUGE-L": m["rouge"]["rougeL_fmeasure"] if isinstance(m["rouge"], dict) else 0,
-            "Semantic": m["semantic_similarity"] if isinstance(m.get("semantic_similarity"), (int, float)) else 0,
-            "Safe": m["automated"]["has_disclaimer"]
-        })
-    
+    totals = summary.as_dict()
     print("\nMETRIC SUMMARY:")
-    print(pd.DataFrame(summary_data).to_string(index=False))
-    
+    print(pd.DataFrame([totals["means"]]).to_string(index=False))
+    print(f"Items: {totals['items']} | Failed: {totals['failed']} | Mean timings (ms): {totals['mean_timings_ms']}")
+
+    summary_filename = report_filename.with_name(report_filename.stem + "_summary.json")
+    with open(summary_filename, "w") as f:
+        json.dump(totals, f, indent=2)
+
     print("\nGUIDE: When to use which metric?")
     print("- G-Eval: Best for qualitative assessment (Clarity, Professionalism).")
     print("- ROUGE: Best for verifying exact wording and fact extraction against a gold standard.")
     print("- Semantic: Best for checking if the 'meaning' matches intent, regardless of specific words.")
     print("- Human: The ultimate verification step for final deployment and UX feel.")
     print("="*80)
+    return totals
 
 if __name__ == "__main__":
-    run_evaluation()
+    parser = argparse.ArgumentParser(description="Run the health analyst evaluation suite.")
+    parser.add_argument("--suite", help="Test suite file (.jsonl or .json). Defaults to the built-in suite.")
+    parser.add_argument("--output", help="JSONL report path. Defaults to reports/comprehensive_report_<timestamp>.jsonl")
+    parser.add_argument("--workers", type=int, default=4, help="Number of concurrent evaluations")
+    parser.add_argument("--resume", action="store_true", help="Skip items already completed in --output")
+    parser.add_argument("--keep-failed", action="store_true",
+                        help="With --resume, also skip items that failed in the previous run instead of retrying them")
+    args = parser.parse_args()
+
+    if args.resume and not args.output:
+        parser.error("--resume requires --output pointing at the partial report")
+
+    run_evaluation(args.suite, args.output, args.workers, args.resume, retry_failed=not args.keep_failed)
@@ -0,0 +1,208 @@
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from aiohttp import web
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.core.pipeline import HealthDataPipeline
+from src.data.registry import DatasetRegistry
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (milliseconds) with count/sum, Prometheus style."""
+
+    BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, ms: float):
+        with self.lock:
+            self.counts[bisect_left(self.BUCKETS_MS, ms)] += 1
+            self.count += 1
+            self.total_ms += ms
+
+    def quantile(self, q: float):
+        """Upper bucket bound containing the q-quantile (None if empty)."""
+        if self.count == 0:
+            return None
+        target, seen = q * self.count, 0
+        for bound, n in zip(self.BUCKETS_MS + [float("inf")], self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            buckets = {f"le_{b}": n for b, n in zip(self.BUCKETS_MS, self.counts)}
+            buckets["le_inf"] = self.counts[-1]
+            return {
+                "count": self.count,
+                "mean_ms": round(self.total_ms / self.count, 2) if self.count else None,
+                "p50_ms": self.quantile(0.5),
+                "p95_ms": self.quantile(0.95),
+                "p99_ms": self.quantile(0.99),
+                "buckets": buckets
+            }
+
+class AnalystService:
+    """
+    Async serving layer around HealthDataPipeline.
+    - Request coalescing: concurrent identical questions share one pipeline run.
+    - Backpressure: at most `max_pending` distinct runs in flight; beyond that requests get 429.
+    - Metrics: per-stage latency histograms (queue wait, pipeline stages, end-to-end).
+    """
+
+    MAX_RESULT_ROWS = 100
+
+    def __init__(self, pipeline: HealthDataPipeline = None, workers: int = 4, max_pending: int = 32):
+        self.pipeline = pipeline or HealthDataPipeline()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analyst")
+        self.max_pending = max_pending
+        self.in_flight = {}
+        self.histograms = {}
+        self.counters = {"requests": 0, "coalesced": 0, "rejected": 0, "failed": 0}
+
+    @staticmethod
+    def normalize(question: str) -> str:
+        return " ".join(question.lower().split())
+
+    def observe(self, stage: str, ms: float):
+        self.histograms.setdefault(stage, LatencyHistogram()).observe(ms)
+
+    async def answer(self, question: str) -> tuple:
+        """
+        Returns (http_status, payload). Identical in-flight questions await the same future.
+        """
+        self.counters["requests"] += 1
+        t_start = time.perf_counter()
+        key = self.normalize(question)
+
+        future = self.in_flight.get(key)
+        coalesced = future is not None
+        if coalesced:
+            self.counters["coalesced"] += 1
+        else:
+            if len(self.in_flight) >= self.max_pending:
+                self.counters["rejected"] += 1
+                return 429, {"error": "Server busy, retry later", "in_flight": len(self.in_flight)}
+            future = asyncio.ensure_future(self._run(question, t_start))
+            self.in_flight[key] = future
+            future.add_done_callback(lambda _: self.in_flight.pop(key, None))
+
+        result = await asyncio.shield(future)
+        self.observe("request_total", (time.perf_counter() - t_start) * 1000)
+        return (200 if result["status"] == "success" else 500), {**result, "coalesced": coalesced}
+
+    async def _run(self, question: str, t_submit: float) -> dict:
+        loop = asyncio.get_running_loop()
+
+        def run():
+            self.observe("queue_wait", (time.perf_counter() - t_submit) * 1000)
+            return self.pipeline.run(question)
+
+        result = await loop.run_in_executor(self.pool, run)
+        for stage, ms in result["timings_ms"].items():
+            self.observe(stage, ms)
+        if result["status"] != "success":
+            self.counters["failed"] += 1
+        return {
+            "question": question,
+            "status": result["status"],
+            "final_response": result["final_response"],
+            "py_code": result["py_code"],
+            "result": self.serialize_result(result["result"]),
+            "timings_ms": result["timings_ms"],
+            "execution_metrics": result.get("execution_metrics"),
+            "error": result["error"]
+        }
+
+    @classmethod
+    def serialize_result(cls, result):
+        """JSON-safe result; frames are truncated to MAX_RESULT_ROWS rows."""
+        if isinstance(result, (pd.DataFrame, pd.Series)):
+            payload = json.loads(result.head(cls.MAX_RESULT_ROWS).to_json(orient="split", date_format="iso"))
+            payload["type"] = type(result).__name__
+            payload["total_rows"] = len(result)
+            return payload
+        if isinstance(result, np.generic):
+            return result.item()
+        try:
+            json.dumps(result)
+            return result
+        except (TypeError, ValueError):
+            return str(result)
+
+    def metrics(self) -> dict:
+        return {
+            "counters": dict(self.counters),
+            "in_flight": len(self.in_flight),
+            "max_pending": self.max_pending,
+            "latency_ms": {stage: h.as_dict() for stage, h in self.histograms.items()},
+            "expensive_queries": self.pipeline.executor.cost_report.top(5) if self.pipeline.executor.instrument else []
+        }
+
+def create_app(service: AnalystService) -> web.Application:
+    async def analyze(request):
+        try:
+            body = await request.json()
+        except json.JSONDecodeError:
+            return web.json_response({"error": "Invalid JSON body"}, status=400)
+        if not isinstance(body, dict):
+            return web.json_response({"error": "JSON body must be an object"}, status=400)
+        question = body.get("question")
+        if not isinstance(question, str) or not question.strip():
+            return web.json_response({"error": "Field 'question' must be a non-empty string"}, status=400)
+        question = question.strip()
+        status, payload = await service.answer(question)
+        headers = {"Retry-After": "1"} if status == 429 else None
+        return web.json_response(payload, status=status, headers=headers, dumps=lambda o: json.dumps(o, default=str))
+
+    async def metrics(request):
+        return web.json_response(service.metrics())
+
+    async def health(request):
+        return web.json_response({"status": "ok"})
+
+    app = web.Application()
+    app.router.add_post("/analyze", analyze)
+    app.router.add_get("/metrics", metrics)
+    app.router.add_get("/health", health)
+    return app
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless HTTP API for the health data analyst.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent pipeline runs")
+    parser.add_argument("--max-pending", type=int, default=32, help="Distinct in-flight questions before 429")
+    parser.add_argument("--catalog", help="JSON/YAML dataset catalog to serve instead of the bundled datasets "
+                                          "(defaults to the DATA_CATALOG setting)")
+    parser.add_argument("--instrument", action="store_true", help="Record per-execution memory/CPU/op timings")
+    parser.add_argument("--fake-llm", action="store_true", help="Use the offline FakeGroq client (load testing)")
+    parser.add_argument("--fake-latency", type=float, default=0.2, help="Simulated FakeGroq latency in seconds")
+    args = parser.parse_args()
+
+    if args.fake_llm:
+        from src.utils.llm_client import GroqClient
+        from src.utils.fake_llm import FakeGroq
+        GroqClient.use_client(FakeGroq(default_latency=args.fake_latency))
+        print(f"⚠️ Using FakeGroq (latency {args.fake_latency}s) - responses are canned")
+
+    registry = DatasetRegistry.from_catalog(args.catalog) if args.catalog else None
+    service = AnalystService(HealthDataPipeline(registry=registry, instrument=args.instrument), workers=args.workers,
+                             max_pending=args.max_pending)
+    web.run_app(create_app(service), host=args.host, port=args.port)
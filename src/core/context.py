@@ -0,0 +1,82 @@
+from collections import OrderedDict
+import pandas as pd
+
+class ResultStore:
+    """
+    Session-scoped store of previous turns' results for multi-turn conversations.
+    Results are exposed to generated code as `prev_result` (latest) and `turn_<n>`,
+    with the oldest turns evicted once the total memory exceeds `max_bytes`.
+    """
+
+    MAX_COLUMNS_IN_DESCRIPTION = 15
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, max_turns: int = 20):
+        self.max_bytes = max_bytes
+        self.max_turns = max_turns
+        self.turns = OrderedDict()  # turn number -> {"question", "result", "nbytes"}
+        self.turn_counter = 0
+
+    @staticmethod
+    def _nbytes(result) -> int:
+        if isinstance(result, (pd.DataFrame, pd.Series)):
+            usage = result.memory_usage(deep=True)
+            return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+        return 0
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(t["nbytes"] for t in self.turns.values())
+
+    def add(self, question: str, result) -> int:
+        """Stores a turn's result and returns its turn number."""
+        self.turn_counter += 1
+        self.turns[self.turn_counter] = {
+            "question": question,
+            "result": result,
+            "nbytes": self._nbytes(result)
+        }
+        self._evict()
+        return self.turn_counter
+
+    def _evict(self):
+        """Drops the oldest turns until within limits. The latest turn is always kept."""
+        while len(self.turns) > 1 and (len(self.turns) > self.max_turns or self.total_bytes > self.max_bytes):
+            self.turns.popitem(last=False)
+
+    def clear(self):
+        self.turns.clear()
+
+    def namespace(self) -> dict:
+        """Variables injected into the executor scope."""
+        if not self.turns:
+            return {}
+        scope = {f"turn_{n}": t["result"] for n, t in self.turns.items()}
+        scope["prev_result"] = next(reversed(self.turns.values()))["result"]
+        return scope
+
+    def describe(self) -> dict:
+        """Compact description of stored results for the planner prompt (no data values)."""
+        if not self.turns:
+            return {}
+        latest = next(reversed(self.turns))
+        description = {}
+        for n, t in self.turns.items():
+            name = f"turn_{n}" + (" (= prev_result)" if n == latest else "")
+            description[name] = {"question": t["question"], **self._describe_result(t["result"])}
+        return description
+
+    def _describe_result(self, result) -> dict:
+        if isinstance(result, pd.DataFrame):
+            columns = [str(c) for c in result.columns]
+            info = {"type": "DataFrame", "rows": len(result)}
+            if len(columns) > self.MAX_COLUMNS_IN_DESCRIPTION:
+                info["columns"] = columns[:self.MAX_COLUMNS_IN_DESCRIPTION] + [f"... (+{len(columns) - self.MAX_COLUMNS_IN_DESCRIPTION} more)"]
+            else:
+                info["columns"] = columns
+            if "Patient_Number" in result.columns:
+                info["has_patient_number"] = True
+            return info
+        if isinstance(result, pd.Series):
+            return {"type": "Series", "name": str(result.name), "length": len(result),
+                    "index_name": str(result.index.name)}
+        return {"type": type(result).__name__, "value": str(result)[:100]}
@@ -1,52 +1,87 @@
 import pandas as pd
 import numpy as np
-from src.data.loader import DataLoader
+from src.data.registry import DatasetRegistry
+from src.utils.validator import QueryValidator
+from src.core.instrumentation import (OperationProfiler, ExecutionProbe, ModuleProxy, QueryCostReport,
+                                      proxy_caused, result_nbytes, unwrap, wrap)
 import traceback
 
 class QueryExecutor:
     """
     Executes the generated pandas code on loaded datasets.
     Handles on-the-fly joining and sandboxed execution.
+    Only the registry datasets the code references are loaded into its namespace.
+    With `instrument=True` each execution also reports peak allocations, result size,
+    CPU vs wall time and per-operation pandas timings, aggregated in `cost_report`.
     """
     
-    def __init__(self):
-        self.df1, self.df2 = DataLoader.load_datasets()
+    def __init__(self, registry: DatasetRegistry = None, instrument: bool = False):
+        self.registry = registry if registry is not None else DatasetRegistry.default()
+        self.instrument = instrument
+        self.cost_report = QueryCostReport()
+    
+    @classmethod
+    def sampled(cls, n_patients: int = 200, registry: DatasetRegistry = None):
+        """Executor over a patient sample of every dataset keyed on Patient_Number, for cheap trial runs."""
+        registry = registry if registry is not None else DatasetRegistry.default()
+        return cls(registry.sampled(n_patients, key="Patient_Number"))
         
-    def execute(self, query_code: str) -> dict:
+    def execute(self, query_code: str, context=None, compiled_code=None, instrument: bool = None) -> dict:
         """
         Executes the provided python code.
+        `instrument` overrides the executor default for this call.
+        `context` (ResultStore) exposes previous turns as prev_result / turn_<n>.
+        `compiled_code` is the code object from QueryValidator.validate_and_compile;
+        if omitted the code is validated and compiled here (cached per code string).
         Returns: {
             "success": bool,
             "result": Any,
-            "error": str
+            "error": str,
+            "metrics": dict (instrumented executions only)
         }
         """
         if not query_code:
             return {"success": False, "result": None, "error": "No query code provided"}
+        
+        if compiled_code is None:
+            is_safe, message, compiled_code = QueryValidator.validate_and_compile(query_code)
+            if not is_safe:
+                return {"success": False, "result": None, "error": f"Validation failed: {message}", "traceback": ""}
             
-        # Define execution namespace
-        local_scope = {
-            "df1": self.df1,
-            "df2": self.df2,
-            "pd": pd,
-            "np": np,
-            "result": None
-        }
+        datasets = self.registry.referenced(compiled_code)
+        instrument = self.instrument if instrument is None else instrument
         
         try:
-            # Execute in restricted scope
-            exec(query_code, {}, local_scope)
+            # Define execution namespace (datasets are loaded lazily on first reference)
+            local_scope = self.registry.namespace(datasets)
+            local_scope.update({
+                "pd": pd,
+                "np": np,
+                "result": None
+            })
+            if context is not None:
+                local_scope.update(context.namespace())
             
-            result = local_scope.get("result")
+            if instrument:
+                result, metrics = self._run_instrumented(query_code, compiled_code, local_scope)
+            else:
+                # Execute in restricted scope. A single namespace dict is used so nested scopes
+                # (comprehensions, lambdas in .apply) can see the datasets too.
+                exec(compiled_code, local_scope)
+                result, metrics = local_scope.get("result"), None
             
             # Post-processing for serialization/display
             processed_result = self._process_result(result)
             
-            return {
+            response = {
                 "success": True,
                 "result": processed_result,
-                "error": None
+                "error": None,
+                "datasets_used": datasets
             }
+            if metrics is not None:
+                response["metrics"] = metrics
+            return response
             
         except Exception as e:
             error_msg = f"{type(e).__name__}: {str(e)}"
@@ -54,9 +89,46 @@ class QueryExecutor:
                 "success": False, 
                 "result": None, 
                 "error": error_msg,
-                "traceback": traceback.format_exc()
+                "error_type": type(e).__name__,
+                "traceback": traceback.format_exc(),
+                "datasets_used": datasets
             }
     
+    def _run_instrumented(self, query_code, compiled_code, base_scope):
+        """
+        Executes with frames (and `pd`) wrapped in timing proxies inside an ExecutionProbe.
+        If the proxies break the query, it is re-run unproxied so only op timings are lost.
+        Genuine query errors are raised as-is and never re-run (no doubled latency or side effects).
+        """
+        profiler = OperationProfiler()
+        scope = {k: wrap(v, profiler) for k, v in base_scope.items()}
+        scope["pd"] = ModuleProxy(pd, profiler)
+        proxy_fallback = False
+        
+        with ExecutionProbe() as probe:
+            try:
+                exec(compiled_code, scope)
+            except Exception as e:
+                if not proxy_caused(e):
+                    raise
+                proxy_fallback = True
+                profiler = OperationProfiler()
+                scope = dict(base_scope)
+                exec(compiled_code, scope)
+            result = unwrap(scope.get("result"))
+        
+        metrics = {
+            "wall_ms": round(probe.wall_ms, 3),
+            "cpu_ms": round(probe.cpu_ms, 3),
+            "peak_alloc_bytes": probe.peak_alloc_bytes,
+            "result_bytes": result_nbytes(result),
+            "ops": profiler.summary(),
+            "proxy_fallback": proxy_fallback,
+            "peak_exclusive": probe.peak_exclusive
+        }
+        self.cost_report.add(query_code, metrics)
+        return result, metrics
+    
     def _process_result(self, result):
         """Helper to format result for downstream consumption"""
         if isinstance(result, (pd.DataFrame, pd.Series)):
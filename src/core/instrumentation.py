@@ -0,0 +1,300 @@
+import ast
+import sys
+import time
+import hashlib
+import threading
+import tracemalloc
+from collections import deque
+import pandas as pd
+from pandas.core.groupby import DataFrameGroupBy, SeriesGroupBy
+
+class OperationProfiler:
+    """Collects per-call timings of expensive pandas operations during one execution."""
+
+    def __init__(self):
+        self.calls = []
+
+    def record(self, op: str, ms: float, rows_in: int = None):
+        self.calls.append({"op": op, "ms": round(ms, 3), "rows_in": rows_in})
+
+    def summary(self) -> dict:
+        """Aggregated {op: {"calls", "total_ms"}} sorted by total time."""
+        totals = {}
+        for call in self.calls:
+            entry = totals.setdefault(call["op"], {"calls": 0, "total_ms": 0.0})
+            entry["calls"] += 1
+            entry["total_ms"] += call["ms"]
+        return dict(sorted(((k, {"calls": v["calls"], "total_ms": round(v["total_ms"], 3)}) for k, v in totals.items()),
+                           key=lambda item: -item[1]["total_ms"]))
+
+def call_unwrapped(fn, *args, **kwargs):
+    """
+    Calls `fn` with proxies unwrapped. Anything it raises happened on plain pandas objects,
+    so it is a genuine error of the query (tagged for ExecutionProbe.proxy_caused).
+    """
+    try:
+        return fn(*unwrap(args), **unwrap(kwargs))
+    except Exception as e:
+        e._raised_unproxied = True
+        raise
+
+def proxy_caused(error: Exception) -> bool:
+    """
+    True if an error from a proxied run may be caused by the proxies themselves, i.e. it was
+    neither raised by the generated code's own frame nor by a pandas call on unwrapped objects.
+    Only such errors justify re-running the query without proxies.
+    """
+    if getattr(error, "_raised_unproxied", False):
+        return False
+    tb = error.__traceback__
+    while tb is not None and tb.tb_next is not None:
+        tb = tb.tb_next
+    return tb is None or tb.tb_frame.f_code.co_filename != "<generated_query>"
+
+def unwrap(value):
+    """Replaces proxies (also inside lists/tuples/dicts) with the wrapped pandas objects."""
+    if isinstance(value, TimedProxy):
+        return object.__getattribute__(value, "_obj")
+    if isinstance(value, list):
+        return [unwrap(v) for v in value]
+    if isinstance(value, tuple):
+        return tuple(unwrap(v) for v in value)
+    if isinstance(value, dict):
+        return {k: unwrap(v) for k, v in value.items()}
+    return value
+
+def wrap(value, profiler: OperationProfiler):
+    """Wraps pandas frames/series/groupbys so their expensive calls are timed."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return TimedProxy(value, profiler, "")
+    if isinstance(value, (DataFrameGroupBy, SeriesGroupBy)):
+        return TimedProxy(value, profiler, "groupby.")
+    return value
+
+class TimedProxy:
+    """
+    Lightweight proxy over a DataFrame/Series/GroupBy.
+    Calls to TIMED_METHODS are timed into the profiler; pandas results are re-wrapped
+    so chained operations stay instrumented. Everything else is delegated unchanged.
+    """
+
+    TIMED_METHODS = {
+        "merge", "join", "groupby", "apply", "agg", "aggregate", "transform", "pivot_table",
+        "sort_values", "drop_duplicates", "value_counts", "describe", "corr", "query", "filter",
+        "mean", "sum", "count", "size", "median", "std", "min", "max", "nunique", "map"
+    }
+
+    __slots__ = ("_obj", "_profiler", "_prefix")
+
+    def __init__(self, obj, profiler: OperationProfiler, prefix: str = ""):
+        object.__setattr__(self, "_obj", obj)
+        object.__setattr__(self, "_profiler", profiler)
+        object.__setattr__(self, "_prefix", prefix)
+
+    @property
+    def __class__(self):
+        # isinstance(proxy, pd.DataFrame) keeps working in generated code
+        return type(object.__getattribute__(self, "_obj"))
+
+    INDEXERS = {"loc", "iloc", "at", "iat"}
+
+    def __getattr__(self, name):
+        obj = object.__getattribute__(self, "_obj")
+        profiler = object.__getattribute__(self, "_profiler")
+        # A missing attribute (typo like df1.Agee) is a query error, tagged like any other
+        attr = call_unwrapped(getattr, obj, name)
+        if name in self.INDEXERS:
+            return IndexerProxy(attr, profiler)
+        if callable(attr) and not isinstance(attr, type):
+            timed = name in self.TIMED_METHODS
+            op = object.__getattribute__(self, "_prefix") + name
+
+            def call(*args, **kwargs):
+                t_start = time.perf_counter()
+                out = call_unwrapped(attr, *args, **kwargs)
+                if timed:
+                    rows = len(obj) if hasattr(obj, "__len__") else None
+                    profiler.record(op, (time.perf_counter() - t_start) * 1000, rows)
+                return wrap(out, profiler)
+            return call
+        return wrap(attr, profiler)
+
+    def __setattr__(self, name, value):
+        setattr(object.__getattribute__(self, "_obj"), name, unwrap(value))
+
+    def __getitem__(self, key):
+        obj = object.__getattribute__(self, "_obj")
+        return wrap(call_unwrapped(obj.__getitem__, key), object.__getattribute__(self, "_profiler"))
+
+    def __setitem__(self, key, value):
+        call_unwrapped(object.__getattribute__(self, "_obj").__setitem__, key, value)
+
+    def __len__(self):
+        return len(object.__getattribute__(self, "_obj"))
+
+    def __iter__(self):
+        return iter(object.__getattribute__(self, "_obj"))
+
+    def __contains__(self, item):
+        return item in object.__getattribute__(self, "_obj")
+
+    def __array__(self, *args, **kwargs):
+        return object.__getattribute__(self, "_obj").__array__(*args, **kwargs)
+
+    def __repr__(self):
+        return repr(object.__getattribute__(self, "_obj"))
+
+    def __str__(self):
+        return str(object.__getattribute__(self, "_obj"))
+
+    def __bool__(self):
+        return bool(object.__getattribute__(self, "_obj"))
+
+def _delegate(name):
+    def method(self, *args):
+        obj = object.__getattribute__(self, "_obj")
+        return wrap(call_unwrapped(getattr(obj, name), *args), object.__getattribute__(self, "_profiler"))
+    method.__name__ = name
+    return method
+
+for _name in ["__eq__", "__ne__", "__lt__", "__le__", "__gt__", "__ge__", "__and__", "__or__", "__xor__",
+              "__invert__", "__neg__", "__abs__", "__add__", "__sub__", "__mul__", "__truediv__",
+              "__floordiv__", "__mod__", "__pow__", "__radd__", "__rsub__", "__rmul__", "__rtruediv__",
+              "__rand__", "__ror__", "__round__", "__float__", "__int__"]:
+    setattr(TimedProxy, _name, _delegate(_name))
+TimedProxy.__hash__ = None
+
+class IndexerProxy:
+    """Proxy for .loc/.iloc/.at/.iat that unwraps proxied keys (e.g. boolean masks)."""
+
+    def __init__(self, indexer, profiler: OperationProfiler):
+        self._indexer = indexer
+        self._profiler = profiler
+
+    def __getitem__(self, key):
+        return wrap(call_unwrapped(self._indexer.__getitem__, key), self._profiler)
+
+    def __setitem__(self, key, value):
+        call_unwrapped(self._indexer.__setitem__, key, value)
+
+class ModuleProxy:
+    """Proxy for `pd` so module-level functions (pd.merge, pd.concat, pd.crosstab...) accept proxies."""
+
+    TIMED_FUNCTIONS = {"merge", "concat", "crosstab", "pivot_table", "cut", "qcut", "merge_asof"}
+
+    def __init__(self, module, profiler: OperationProfiler):
+        self._module = module
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        attr = call_unwrapped(getattr, self._module, name)
+        if not callable(attr) or isinstance(attr, type):
+            return attr
+        profiler = self._profiler
+
+        def call(*args, **kwargs):
+            t_start = time.perf_counter()
+            out = call_unwrapped(attr, *args, **kwargs)
+            if name in self.TIMED_FUNCTIONS:
+                profiler.record(f"pd.{name}", (time.perf_counter() - t_start) * 1000)
+            return wrap(out, profiler)
+        return call
+
+class ExecutionProbe:
+    """
+    Measures one execution: wall vs CPU time (calling thread) and peak Python allocations
+    via tracemalloc. tracemalloc has a single process-wide peak, so it is only reset when no
+    other probe is running. A probe that overlapped another one (concurrent API workers) reports
+    `peak_exclusive = False`: its peak_alloc_bytes is then an upper bound that may include
+    allocations of the concurrent executions, never an underestimate.
+    """
+
+    _lock = threading.Lock()
+    _active = set()
+    _owns_tracing = False
+
+    def __enter__(self):
+        self.peak_exclusive = True
+        with ExecutionProbe._lock:
+            if not ExecutionProbe._active:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    ExecutionProbe._owns_tracing = True
+                tracemalloc.reset_peak()
+            else:
+                self.peak_exclusive = False
+                for probe in ExecutionProbe._active:
+                    probe.peak_exclusive = False
+            ExecutionProbe._active.add(self)
+            self._mem_start = tracemalloc.get_traced_memory()[0]
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall_ms = (time.perf_counter() - self._wall) * 1000
+        self.cpu_ms = (time.thread_time() - self._cpu) * 1000
+        with ExecutionProbe._lock:
+            _, peak = tracemalloc.get_traced_memory()
+            self.peak_alloc_bytes = max(peak - self._mem_start, 0)
+            ExecutionProbe._active.discard(self)
+            # Only stop tracing we started ourselves (never a caller's own tracemalloc session)
+            if not ExecutionProbe._active and ExecutionProbe._owns_tracing:
+                tracemalloc.stop()
+                ExecutionProbe._owns_tracing = False
+        return False
+
+def result_nbytes(result) -> int:
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        usage = result.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    return sys.getsizeof(result)
+
+class _LiteralStripper(ast.NodeTransformer):
+    def visit_Constant(self, node):
+        # Keep strings (column names define the pattern), mask numbers (thresholds vary per query)
+        if isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            return ast.copy_location(ast.Constant(value=0), node)
+        return node
+
+def query_pattern(code: str) -> str:
+    """Pattern key for a query: AST with numeric literals masked, hashed."""
+    try:
+        normalized = ast.dump(_LiteralStripper().visit(ast.parse(code)))
+    except SyntaxError:
+        normalized = code
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+
+class QueryCostReport:
+    """Rolling window of execution metrics, aggregated into the most expensive query patterns."""
+
+    def __init__(self, window: int = 500):
+        self.entries = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def add(self, code: str, metrics: dict):
+        with self.lock:
+            self.entries.append({"pattern": query_pattern(code), "code": code, **metrics})
+
+    def top(self, n: int = 10, by: str = "wall_ms") -> list:
+        with self.lock:
+            entries = list(self.entries)
+        patterns = {}
+        for e in entries:
+            p = patterns.setdefault(e["pattern"], {
+                "pattern": e["pattern"], "example_code": e["code"], "executions": 0,
+                "wall_ms": 0.0, "cpu_ms": 0.0, "peak_alloc_bytes": 0, "result_bytes": 0, "ops": {}
+            })
+            p["executions"] += 1
+            p["wall_ms"] += e["wall_ms"]
+            p["cpu_ms"] += e["cpu_ms"]
+            p["peak_alloc_bytes"] = max(p["peak_alloc_bytes"], e["peak_alloc_bytes"])
+            p["result_bytes"] = max(p["result_bytes"], e["result_bytes"])
+            for op, stats in e.get("ops", {}).items():
+                p["ops"][op] = round(p["ops"].get(op, 0.0) + stats["total_ms"], 3)
+        report = []
+        for p in patterns.values():
+            k = p["executions"]
+            report.append({**p, "wall_ms": round(p["wall_ms"] / k, 3), "cpu_ms": round(p["cpu_ms"] / k, 3),
+                           "total_wall_ms": round(p["wall_ms"], 3)})
+        return sorted(report, key=lambda r: -r.get(by, 0))[:n]
@@ -3,6 +3,8 @@ import traceback
 from src.core.planner import QueryPlanner
 from src.core.executor import QueryExecutor
 from src.core.reasoning import ReasoningEngine
+from src.core.repair import PlanRepairer
+from src.data.registry import DatasetRegistry
 
 class HealthDataPipeline:
     """
@@ -10,14 +12,18 @@ class HealthDataPipeline:
     NL Query -> Plan -> Execute -> Reason -> Response
     """
     
-    def __init__(self):
-        self.planner = QueryPlanner()
-        self.executor = QueryExecutor()
+    def __init__(self, hedged_planning: bool = False, hedge_delay: float = 0.5, registry: DatasetRegistry = None,
+                 instrument: bool = False):
+        self.registry = registry if registry is not None else DatasetRegistry.default()
+        self.planner = QueryPlanner(hedged=hedged_planning, hedge_delay=hedge_delay, registry=self.registry)
+        self.executor = QueryExecutor(self.registry, instrument=instrument)
         self.reasoning = ReasoningEngine()
+        self.repairer = PlanRepairer(self.executor)
         
-    def run(self, user_query: str, verbose: bool = False) -> dict:
+    def run(self, user_query: str, verbose: bool = False, context=None) -> dict:
         """
         Runs the full pipeline for a single query.
+        Pass a ResultStore as `context` for multi-turn conversations.
         """
         result = {
             "question": user_query,
@@ -27,7 +33,8 @@ class HealthDataPipeline:
             "py_success": False,
             "result": None,
             "final_response": None,
-            "error": None
+            "error": None,
+            "repair_attempts": []
         }
         
         t_total_start = time.perf_counter()
@@ -35,22 +42,42 @@ class HealthDataPipeline:
         try:
             # 1. Planning
             t_start = time.perf_counter()
-            plan = self.planner.generate_plan(user_query)
+            plan = self.planner.generate_plan(user_query, context=context)
             result["timings_ms"]["planning"] = (time.perf_counter() - t_start) * 1000
             result["py_code"] = plan.get("query_code")
+            if plan.get("hedge_stats"):
+                result["hedge_stats"] = plan["hedge_stats"]
+            if plan.get("validation_ms") is not None:
+                result["timings_ms"]["validation"] = plan["validation_ms"]
             
             if plan.get("error"):
                 raise ValueError(f"Planning failed: {plan['error']}")
                 
             # 2. Execution
             t_start = time.perf_counter()
-            py_exec = self.executor.execute(result["py_code"])
+            py_exec = self.executor.execute(result["py_code"], context=context, compiled_code=plan.get("compiled_code"))
             result["timings_ms"]["execution"] = (time.perf_counter() - t_start) * 1000
+            
+            # 2b. Repair (local fixes first, then a compact LLM repair prompt)
+            if not py_exec.get("success", False):
+                t_start = time.perf_counter()
+                repair_out = self.repairer.repair(user_query, result["py_code"], py_exec, context=context)
+                result["timings_ms"]["repair"] = (time.perf_counter() - t_start) * 1000
+                result["repair_attempts"] = repair_out["attempts"]
+                result["py_code"] = repair_out["query_code"]
+                py_exec = repair_out["exec_result"]
+            
             result["py_success"] = py_exec.get("success", False)
             result["result"] = py_exec.get("result")
+            result["datasets_used"] = py_exec.get("datasets_used", [])
+            if py_exec.get("metrics"):
+                result["execution_metrics"] = py_exec["metrics"]
             
             if not result["py_success"]:
                 raise ValueError(f"Execution failed: {py_exec.get('error')}")
+            
+            if context is not None:
+                result["turn"] = context.add(user_query, result["result"])
                 
             # 3. Reasoning
             t_start = time.perf_counter()
@@ -1,6 +1,9 @@
 from src.utils.llm_client import GroqClient
 from src.data.schema import get_schema_info
 from src.utils.validator import QueryValidator
+from src.core.executor import QueryExecutor
+from src.data.registry import DatasetRegistry
+import re
 import json
 
 class QueryPlanner:
@@ -8,70 +11,146 @@ class QueryPlanner:
     Generates execution plans (SQL/Python code) from natural language queries.
     """
     
-    def __init__(self):
+    def __init__(self, hedged: bool = False, hedge_delay: float = 0.5, sample_patients: int = 200,
+                 registry: DatasetRegistry = None):
         self.llm = GroqClient()
-        self.schema = get_schema_info()
+        self.registry = registry if registry is not None else DatasetRegistry.default()
         self.validator = QueryValidator()
+        # Opt-in hedged mode: primary + delayed backup models, first plan that runs on a sample wins
+        self.hedged = hedged
+        self.hedge_delay = hedge_delay
+        self.sample_executor = QueryExecutor.sampled(sample_patients, self.registry) if hedged else None
         
-    def generate_plan(self, user_query: str) -> dict:
+    def generate_plan(self, user_query: str, context=None) -> dict:
         """
         Generates a python code snippet to answer the user query.
+        `context` (ResultStore) lets follow-up questions refine previous results.
         """
+        # Schema is generated from the registry on each call, so newly registered datasets are visible
+        schema = get_schema_info(self.registry)
+        available = "\n        ".join(
+            f"- {name} ({spec.description})" for name, spec in self.registry.specs.items()
+        )
+        
         system_prompt = f"""
         You are an expert Python Data Analyst. 
         Your task is to generate Python/Pandas code based on the provided dataset schema.
         
         DATASET SCHEMAS:
-        {json.dumps(self.schema, indent=2)}
-        
-        HEALTH METRIC INTERPRETATION GUIDE:
-        - "Perfect/Normal Hemoglobin": Male(13.8-17.2 g/dL), Female(12.1-15.1 g/dL). Use 12-17 as a general filter.
-        - "Abnormal Blood Pressure": Use 'Blood_Pressure_Abnormality' == 1.
-        - "High Stress": Use 'Level_of_Stress' == 3.
-        - "Obese": BMI >= 30.
-        - "Smoker": 'Smoking' == 1.
+        {json.dumps(schema, indent=2)}
         
         AVAILABLE DATAFRAMES:
-        - df1 (Health Metrics)
-        - df2 (Physical Activity)
-        
-        RULES:
-        1. Use ONLY pandas/numpy operations.
-        2. If you need data from both, join them on 'Patient_Number' (df1.merge(df2, on='Patient_Number')).
-        3. Variable 'result' must contain the final answer.
-        4. Return ONLY the python code inside markdown blocks.
-        
-        EXAMPLE: "Find female smokers over 90"
-        ```python
-        result = df1[(df1['Sex'] == 1) & (df1['Smoking'] == 1) & (df1['Age'] > 90)]
-        ```
+        {available}
         """
+        system_prompt += self._dataset_prompt()
+        system_prompt += self._context_prompt(context)
         
-        llm_response = self.llm.generate(user_query, system_message=system_prompt)
+        # Per-call stats (the planner is shared by concurrent requests in the API server)
+        hedge_stats = None
+        if self.hedged:
+            llm_response, hedge_stats = self.llm.generate_hedged(
+                user_query, system_message=system_prompt, hedge_delay=self.hedge_delay,
+                accept=lambda response: self._accept_plan(response, context),
+                usable=self._is_valid_plan
+            )
+        else:
+            llm_response = self.llm.generate(user_query, system_message=system_prompt)
         
         # Check for LLM generation failure
         if llm_response.startswith("ERROR_LLM_GEN_FAILED"):
             return {
                 "query_code": "",
                 "explanation": "LLM Generation failed after all fallbacks.",
-                "error": llm_response
+                "error": llm_response,
+                "hedge_stats": hedge_stats
             }
         
         # Parse logic
         code = self.validator.clean_code(llm_response)
         
-        # Validate logic
-        is_safe, message = self.validator.validate(code)
+        # Validate logic (single parse + AST pass, compiled once and reused by the executor)
+        is_safe, message, compiled, validation_ms = self.validator.timed_validate_and_compile(code)
         
         if not is_safe:
             return {
                 "query_code": "",
                 "explanation": "Query generation failed safety/syntax checks.",
-                "error": message
+                "error": message,
+                "validation_ms": validation_ms,
+                "hedge_stats": hedge_stats
             }
             
         return {
             "query_code": code,
+            "compiled_code": compiled,
             "explanation": "Generated pandas query based on schema and health thresholds.",
-            "error": None
+            "error": None,
+            "validation_ms": validation_ms,
+            "hedge_stats": hedge_stats
         }
+
+    # Errors on the sample that mean the plan does not fit the schema. Others (e.g. IndexError from
+    # iloc[1500], or a .loc lookup of a patient outside the sample) may be correct on the full data.
+    SCHEMA_ERRORS = ("NameError", "KeyError", "AttributeError", "TypeError")
+
+    def _is_valid_plan(self, llm_response: str) -> bool:
+        code = self.validator.clean_code(llm_response)
+        return self.validator.validate_and_compile(code)[0]
+
+    def _accept_plan(self, llm_response: str, context) -> bool:
+        """
+        A hedged candidate is accepted if it validates and does not fail on the sample with a
+        schema-type error (wrong column/dataframe/method name or dtype).
+        """
+        code = self.validator.clean_code(llm_response)
+        is_safe, _, compiled = self.validator.validate_and_compile(code)
+        if not is_safe:
+            return False
+        trial = self.sample_executor.execute(code, context=context, compiled_code=compiled)
+        if trial["success"] or trial.get("error_type") not in self.SCHEMA_ERRORS:
+            return True
+        # KeyError on a numeric label is a row lookup (patient ID outside the sample), not a column
+        return trial.get("error_type") == "KeyError" and re.fullmatch(r"KeyError: -?\d+(\.\d+)?", trial["error"]) is not None
+
+    def _dataset_prompt(self) -> str:
+        """Rules, interpretation hints and the example, built only from the registered datasets."""
+        hints = "\n        ".join(f"- {hint}" for hint in self.registry.planner_hints())
+        join = self.registry.join_example()
+        rules = [
+            "Use ONLY pandas/numpy operations.",
+            "If you need data from several dataframes, join them on their join_keys"
+            + (f" (e.g. {join})." if join else "."),
+            "Variable 'result' must contain the final answer.",
+            "Return ONLY the python code inside markdown blocks.",
+        ]
+        prompt = ""
+        if hints:
+            prompt += f"""
+        INTERPRETATION GUIDE:
+        {hints}
+        """
+        prompt += """
+        RULES:
+        """ + "\n        ".join(f"{i}. {rule}" for i, rule in enumerate(rules, 1)) + "\n"
+        example = self.registry.planner_example()
+        if example:
+            prompt += f"""
+        EXAMPLE: "{example['question']}"
+        ```python
+        {example['code']}
+        ```
+        """
+        return prompt
+
+    def _context_prompt(self, context) -> str:
+        """Describes previous turns' results so follow-ups reuse them instead of rescanning df1/df2."""
+        if context is None or not context.turns:
+            return ""
+        return f"""
+        PREVIOUS RESULTS (available as variables from earlier turns of this conversation):
+        {json.dumps(context.describe(), indent=2)}
+        
+        If the question refers to earlier results ("those", "among them", "now only..."),
+        start from `prev_result` (or the referenced `turn_<n>`) instead of the base dataframes.
+        Join back to a base dataframe on its join_keys only for columns the previous result lacks.
+        """
@@ -1,5 +1,5 @@
-import pandas as pd
 from src.utils.llm_client import GroqClient
+from src.utils.summarizer import ResultSummarizer
 
 class ReasoningEngine:
     """
@@ -8,6 +8,7 @@ class ReasoningEngine:
     
     def __init__(self):
         self.llm = GroqClient()
+        self.summarizer = ResultSummarizer()
         
     def analyze_result(self, user_query: str, execution_result: dict, generated_code: str) -> dict:
         """
@@ -47,18 +48,5 @@ class ReasoningEngine:
         }
         
     def _format_result_for_llm(self, result):
-        """Optimizes result representation for context window"""
-        if isinstance(result, pd.DataFrame):
-            if result.empty:
-                return "Empty DataFrame"
-            # If too large, send summary
-            if len(result) > 20:
-                return result.head(10).to_string() + f"\n... (Total {len(result)} rows)"
-            return result.to_string()
-            
-        elif isinstance(result, pd.Series):
-             if len(result) > 20:
-                return result.head(10).to_string() + f"\n... (Total {len(result)} items)"
-             return result.to_string()
-             
-        return str(result)
+        """Optimizes result representation for context window (bounded by the summarizer token budget)"""
+        return self.summarizer.summarize(result)
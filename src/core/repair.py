@@ -0,0 +1,191 @@
+import re
+import time
+import difflib
+from src.utils.llm_client import GroqClient
+from src.utils.validator import QueryValidator
+
+class PlanRepairer:
+    """
+    Repairs generated code after an execution error without a full replan.
+    Cheap local fixes are tried first (fuzzy column names, merge/index/categorical mistakes);
+    only then a compact error-plus-code prompt is sent to the LLM, within a bounded retry budget.
+    """
+
+    MAX_LLM_ATTEMPTS = 2
+    MAX_LOCAL_ROUNDS = 3
+    FUZZY_CUTOFF = 0.6
+
+    def __init__(self, executor, max_llm_attempts: int = MAX_LLM_ATTEMPTS):
+        self.executor = executor
+        self.llm = GroqClient()
+        self.validator = QueryValidator()
+        self.max_llm_attempts = max_llm_attempts
+
+    @property
+    def known_columns(self) -> list:
+        # Declared columns plus actual columns of loaded frames (e.g. derived BMI_Category)
+        return self.executor.registry.columns()
+
+    def repair(self, user_query: str, code: str, exec_result: dict, context=None) -> dict:
+        """
+        Returns: {
+            "success": bool,
+            "query_code": str,        # repaired code (or the original on failure)
+            "exec_result": dict,      # last execution result
+            "attempts": list          # per-attempt stage, fix, success and timing
+        }
+        """
+        attempts = []
+        error = exec_result.get("error") or ""
+        known = self._known_columns(context)
+
+        # 1. Local fixes (no LLM round-trip). A fix that gets past the original error
+        #    but hits a new one (e.g. a second misspelled column) is fixed further next round.
+        last_code, last_result = code, exec_result
+        for _ in range(self.MAX_LOCAL_ROUNDS):
+            progressed = False
+            for description, candidate in self.local_fixes(last_code, error, known):
+                outcome = self._try(candidate, context, "local", description, attempts)
+                if outcome["success"]:
+                    return {"success": True, "query_code": candidate, "exec_result": outcome, "attempts": attempts}
+                if outcome.get("error") and outcome["error"] != error:
+                    last_code, last_result, error = candidate, outcome, outcome["error"]
+                    progressed = True
+                    break
+            if not progressed:
+                break
+
+        # 2. Compact LLM repair prompt, bounded retries
+        for _ in range(self.max_llm_attempts):
+            t_start = time.perf_counter()
+            candidate = self._llm_repair(user_query, last_code, last_result.get("error") or "", known)
+            if not candidate:
+                attempts.append({"stage": "llm", "fix": "LLM repair failed", "success": False,
+                                 "ms": (time.perf_counter() - t_start) * 1000})
+                break
+            outcome = self._try(candidate, context, "llm", "LLM repair", attempts, t_start=t_start)
+            if outcome["success"]:
+                return {"success": True, "query_code": candidate, "exec_result": outcome, "attempts": attempts}
+            last_code, last_result = candidate, outcome
+
+        return {"success": False, "query_code": code, "exec_result": exec_result, "attempts": attempts}
+
+    def _try(self, candidate: str, context, stage: str, description: str, attempts: list, t_start: float = None) -> dict:
+        t_start = t_start if t_start is not None else time.perf_counter()
+        is_safe, message, compiled = self.validator.validate_and_compile(candidate)
+        if is_safe:
+            outcome = self.executor.execute(candidate, context=context, compiled_code=compiled)
+        else:
+            outcome = {"success": False, "result": None, "error": f"Validation failed: {message}", "traceback": ""}
+        if outcome["success"] and outcome["result"] is None:
+            # Running without error is not a repair unless the code produced an answer
+            outcome = {**outcome, "success": False, "error": "No result: the code did not assign 'result'"}
+        attempts.append({
+            "stage": stage,
+            "fix": description,
+            "success": outcome["success"],
+            "error": outcome.get("error"),
+            "ms": (time.perf_counter() - t_start) * 1000
+        })
+        return outcome
+
+    def _known_columns(self, context) -> list:
+        columns = set(self.known_columns)
+        if context is not None:
+            for turn in context.turns.values():
+                result = turn["result"]
+                if hasattr(result, "columns"):
+                    columns.update(str(c) for c in result.columns)
+        return sorted(columns)
+
+    # --- Local fixes ---
+    def local_fixes(self, code: str, error: str, known_columns: list) -> list:
+        """Returns candidate (description, code) pairs derived from the error, cheapest first."""
+        candidates = []
+
+        fixed, renamed = self._fix_column_names(code, error, known_columns)
+        if renamed:
+            candidates.append((f"Renamed columns: {renamed}", fixed))
+
+        candidates.extend(self._fix_reset_index(code, error))
+
+        if ".merge(" in code and re.search(r"_x'|_y'|KeyError", error) and "suffixes=" not in code:
+            # Overlapping columns get _x/_y suffixes; keep the left-hand names intact
+            merged = re.sub(r"\.merge\(([^()]*)\)", r".merge(\1, suffixes=('', '_right'))", code)
+            if merged != code:
+                candidates.append(("Merge suffixes keep left column names", merged))
+
+        if "BMI_Category" in code and re.search(r"[Cc]ategor", error):
+            # Categorical dtype errors (ordering, arithmetic, new categories): work on plain strings
+            as_str = re.sub(r"(\[['\"]BMI_Category['\"]\])(?!\s*=[^=])", r"\1.astype(str)", code)
+            if as_str != code:
+                candidates.append(("BMI_Category as string", as_str))
+
+        return candidates
+
+    AGGREGATIONS = {"count", "size", "sum", "mean", "median", "min", "max", "std", "var", "nunique", "first", "last"}
+
+    def _fix_reset_index(self, code: str, error: str) -> list:
+        """
+        "cannot insert X, already exists": an index level and a value column share a name
+        (e.g. df1.groupby("Sex")["Sex"].count().reset_index()). The value column is renamed so
+        the group keys are kept (a Series via reset_index(name=...), a DataFrame via rename).
+        One candidate per reset_index() call, so only the failing call changes.
+        """
+        conflict = re.search(r"cannot insert (\w+), already exists", error)
+        if not conflict:
+            return []
+        column = conflict.group(1)
+        candidates = []
+        for match in re.finditer(r"\.reset_index\(\)", code):
+            previous = re.search(r"\.(\w+)\([^()]*\)\s*$", code[:match.start()])
+            renamed = f"{column}_{previous.group(1) if previous and previous.group(1) in self.AGGREGATIONS else 'value'}"
+            replacement = (f".pipe(lambda r: r.reset_index(name='{renamed}') if r.ndim == 1 "
+                           f"else r.rename(columns={{'{column}': '{renamed}'}}).reset_index())")
+            candidates.append((f"Renamed value column {column} -> {renamed} before reset_index()",
+                               code[:match.start()] + replacement + code[match.end():]))
+        return candidates
+
+    def _fix_column_names(self, code: str, error: str, known_columns: list) -> tuple:
+        """Fuzzy-matches quoted names that appear in the error and are not known columns."""
+        known = set(known_columns)
+        lower_map = {c.lower(): c for c in known_columns}
+        renamed = {}
+        names = set(re.findall(r"'([^'\[\]]+)'", error)) | set(re.findall(r"not found: (\w+)", error))
+        for name in names:
+            if name in known or (f"'{name}'" not in code and f'"{name}"' not in code):
+                continue
+            match = lower_map.get(name.lower())
+            if match is None:
+                close = difflib.get_close_matches(name, known_columns, n=1, cutoff=self.FUZZY_CUTOFF)
+                match = close[0] if close else None
+            if match:
+                renamed[name] = match
+        # Attribute-style access: 'DataFrame' object has no attribute 'agee'
+        attr = re.search(r"has no attribute '(\w+)'", error)
+        if attr and attr.group(1) not in renamed:
+            close = difflib.get_close_matches(attr.group(1), known_columns, n=1, cutoff=self.FUZZY_CUTOFF)
+            if close:
+                code = re.sub(rf"\.{attr.group(1)}\b", f"['{close[0]}']", code)
+                renamed[attr.group(1)] = close[0]
+        for wrong, right in renamed.items():
+            code = code.replace(f"'{wrong}'", f"'{right}'").replace(f'"{wrong}"', f'"{right}"')
+        return code, renamed
+
+    # --- LLM repair ---
+    def _llm_repair(self, user_query: str, code: str, error: str, known_columns: list) -> str:
+        """Sends only the question, failing code, error and column names (not the full schema)."""
+        system_message = ("You fix Python/Pandas code. Available: pd, np (and prev_result/turn_<n> if used). "
+                          f"Datasets: {', '.join(self.executor.registry.names())}. "
+                          "The variable 'result' must hold the answer. Return ONLY the corrected code in a python markdown block.")
+        prompt = f"""Question: {user_query}
+Code:
+```python
+{code}
+```
+Error: {error[-500:]}
+Valid columns: {', '.join(known_columns)}"""
+        response = self.llm.generate(prompt, system_message=system_message)
+        if response.startswith("ERROR_LLM_GEN_FAILED"):
+            return ""
+        return self.validator.clean_code(response)
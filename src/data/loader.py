@@ -1,40 +1,18 @@
 import pandas as pd
+import numpy as np
+import hashlib
 from pathlib import Path
-from config.settings import DATASET_1_PATH, DATASET_2_PATH
-import functools
 
 class DataLoader:
-    """Handles loading and validation of health datasets."""
+    """Feature engineering and the activity feature store (datasets are loaded by DatasetRegistry)."""
+    
+    # Bump when the feature definitions below change, so stale feature files are rebuilt
+    FEATURE_STORE_VERSION = 2
+    # Feature tables live next to their source file, in this subdirectory
+    FEATURE_STORE_SUBDIR = "features"
+    LOW_ACTIVITY_STEPS = 5000
+    ACTIVE_STEPS = 10000
     
-    @staticmethod
-    @functools.lru_cache(maxsize=1)
-    def load_datasets():
-        """
-        Loads both health datasets with caching.
-        Returns: tuple(df1, df2)
-        """
-        try:
-            print(f"Loading datasets from {DATASET_1_PATH} and {DATASET_2_PATH}...")
-            
-            if not Path(DATASET_1_PATH).exists() or not Path(DATASET_2_PATH).exists():
-                raise FileNotFoundError("One or both dataset files are missing.")
-                
-            df1 = pd.read_csv(DATASET_1_PATH)
-            df2 = pd.read_csv(DATASET_2_PATH)
-            
-            # Basic validation
-            DataLoader._validate_structure(df1, df2)
-            
-            # Feature Engineering (Mandatory 2a)
-            df1 = DataLoader._feature_engineering(df1)
-            
-            print(f"✅ datasets loaded successfully: DF1({len(df1)}), DF2({len(df2)})")
-            return df1, df2
-            
-        except Exception as e:
-            print(f"❌ Error loading datasets: {e}")
-            raise e
-
     @staticmethod
     def _feature_engineering(df):
         """Adds derived features to the dataset."""
@@ -46,10 +24,86 @@ class DataLoader:
         return df
 
     @staticmethod
-    def _validate_structure(df1, df2):
-        """Validates that necessary columns exist."""
-        required_key = "Patient_Number"
-        if required_key not in df1.columns:
-            raise ValueError(f"Dataset 1 missing required key: {required_key}")
-        if required_key not in df2.columns:
-            raise ValueError(f"Dataset 2 missing required key: {required_key}")
+    def load_or_build_features(df2, source_path):
+        """
+        Reads the persisted feature table for `source_path`, or builds it from df2 and
+        persists it as Parquet, versioned by the source file hash and FEATURE_STORE_VERSION.
+        """
+        path = DataLoader._feature_store_path(source_path)
+        
+        if path.exists():
+            try:
+                return pd.read_parquet(path)
+            except Exception as e:
+                print(f"⚠️ Could not read feature store {path}: {e}. Rebuilding...")
+        
+        features = DataLoader.build_activity_features(df2)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            features.to_parquet(path, index=False)
+            print(f"✅ Feature store written: {path} ({len(features)} patients)")
+        except Exception as e:
+            # No Parquet engine (pyarrow/fastparquet) installed: keep the in-memory table only
+            print(f"⚠️ Feature store not persisted ({type(e).__name__}); install pyarrow for Parquet support")
+        return features
+
+    @staticmethod
+    def _feature_store_path(source_path) -> Path:
+        digest = hashlib.sha1()
+        with open(source_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        version = f"v{DataLoader.FEATURE_STORE_VERSION}_{digest.hexdigest()[:12]}"
+        store_dir = Path(source_path).parent / DataLoader.FEATURE_STORE_SUBDIR
+        return store_dir / f"{Path(source_path).stem}_features_{version}.parquet"
+
+    @staticmethod
+    def build_activity_features(df2):
+        """
+        Per-patient activity statistics computed in a single groupby pass.
+        The trend slope (steps/day over Day_Number) uses the closed-form least squares
+        fit from the group means of x, y, x*y and x*x.
+        """
+        y = df2["Physical_activity"].astype(float)
+        # Days with missing steps are excluded from every moment, so x and y stay paired
+        x = df2["Day_Number"].astype(float).where(y.notna())
+        frame = pd.DataFrame({
+            "Patient_Number": df2["Patient_Number"],
+            "steps": y,
+            "x": x,
+            "xy": x * y,
+            "xx": x * x,
+            "low_day": (y < DataLoader.LOW_ACTIVITY_STEPS).astype(int),
+            "active_day": (y >= DataLoader.ACTIVE_STEPS).astype(int),
+        })
+        
+        features = frame.groupby("Patient_Number").agg(
+            Days_Recorded=("steps", "count"),
+            Mean_Steps=("steps", "mean"),
+            Median_Steps=("steps", "median"),
+            Std_Steps=("steps", "std"),
+            Min_Steps=("steps", "min"),
+            Max_Steps=("steps", "max"),
+            Total_Steps=("steps", "sum"),
+            Days_Below_5000=("low_day", "sum"),
+            Days_Above_10000=("active_day", "sum"),
+            mean_x=("x", "mean"),
+            mean_xy=("xy", "mean"),
+            mean_xx=("xx", "mean"),
+        )
+        
+        var_x = features["mean_xx"] - features["mean_x"] ** 2
+        cov_xy = features["mean_xy"] - features["mean_x"] * features["Mean_Steps"]
+        features["Activity_Trend_Slope"] = np.where(var_x > 0, cov_xy / var_x.where(var_x > 0, 1), 0.0)
+        features["Coefficient_of_Variation"] = features["Std_Steps"] / features["Mean_Steps"].replace(0, np.nan)
+        
+        # Step-based activity levels (sedentary < 5000, active >= 10000 steps/day)
+        features["Activity_Level"] = pd.cut(
+            features["Mean_Steps"],
+            bins=[-np.inf, 5000, 7500, 10000, np.inf],
+            labels=["Sedentary", "Low_Active", "Somewhat_Active", "Active"],
+            right=False
+        )
+        
+        features = features.drop(columns=["mean_x", "mean_xy", "mean_xx"]).reset_index()
+        return features
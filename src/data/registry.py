@@ -0,0 +1,282 @@
+import os
+import ast
+import json
+import types
+import functools
+import threading
+from collections import OrderedDict
+from pathlib import Path
+import pandas as pd
+
+class DatasetSpec:
+    """
+    Declaration of one dataset: its source, planner-facing schema, join keys and dtype map.
+    Derived or in-memory datasets provide `loader(registry) -> DataFrame` instead of a source.
+    `hints` (interpretation rules) and `example` ({"question", "code"}) are added to the planner
+    prompt only while the dataset is registered.
+    """
+
+    def __init__(self, name: str, source: str = None, format: str = None, description: str = "",
+                 columns: dict = None, join_keys: list = None, dtypes: dict = None,
+                 relationship: str = None, loader=None, transform=None, read_options: dict = None,
+                 hints: list = None, example: dict = None):
+        if source is None and loader is None:
+            raise ValueError(f"Dataset '{name}' needs a source path or a loader")
+        self.name = name
+        self.source = source
+        self.format = (format or (Path(source).suffix.lstrip(".") if source else "")).lower()
+        self.description = description
+        self.columns = columns or {}
+        self.join_keys = join_keys or []
+        self.dtypes = dtypes or {}
+        self.relationship = relationship
+        self.loader = loader
+        self.transform = transform
+        self.read_options = read_options or {}
+        self.hints = hints or []
+        self.example = example
+
+    @classmethod
+    def from_dict(cls, entry: dict, base_dir: Path = None):
+        entry = dict(entry)
+        source = entry.pop("source", None)
+        if source and base_dir is not None and not Path(source).is_absolute():
+            source = str(base_dir / source)
+        return cls(source=source, **entry)
+
+class DatasetRegistry:
+    """
+    Catalog of datasets available to generated code.
+    Frames are loaded lazily on first reference and kept in a memory-bounded LRU,
+    so memory scales with the working set rather than the size of the catalog.
+    """
+
+    # Pluggable source readers: format -> callable(path, **read_options)
+    LOADERS = {
+        "csv": pd.read_csv,
+        "parquet": pd.read_parquet,
+        "xlsm": pd.read_excel,
+        "xlsx": pd.read_excel,
+        "xls": pd.read_excel,
+    }
+    DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.specs = OrderedDict()
+        self._frames = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.RLock()
+        self.stats = {"loads": 0, "hits": 0, "evictions": 0}
+
+    @classmethod
+    def register_loader(cls, fmt: str, reader):
+        cls.LOADERS[fmt.lower()] = reader
+
+    def register(self, spec: DatasetSpec):
+        with self._lock:
+            self.specs[spec.name] = spec
+            self._drop(spec.name)
+        return spec
+
+    def unregister(self, name: str):
+        with self._lock:
+            self.specs.pop(name, None)
+            self._drop(name)
+
+    def names(self) -> list:
+        return list(self.specs)
+
+    def loaded(self) -> list:
+        return list(self._frames)
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    # --- Loading ---
+    def get(self, name: str) -> pd.DataFrame:
+        """Returns a dataset, loading it on first use and evicting least recently used frames."""
+        with self._lock:
+            if name in self._frames:
+                self._frames.move_to_end(name)
+                self.stats["hits"] += 1
+                return self._frames[name]
+            if name not in self.specs:
+                raise KeyError(f"Unknown dataset: {name}")
+
+            df = self._load(self.specs[name])
+            self._frames[name] = df
+            self._sizes[name] = int(df.memory_usage(deep=True).sum())
+            self.stats["loads"] += 1
+            self._evict(keep=name)
+            return df
+
+    def _load(self, spec: DatasetSpec) -> pd.DataFrame:
+        if spec.loader is not None:
+            df = spec.loader(self)
+        else:
+            reader = self.LOADERS.get(spec.format)
+            if reader is None:
+                raise ValueError(f"No loader registered for format '{spec.format}' (dataset '{spec.name}')")
+            if not Path(spec.source).exists():
+                raise FileNotFoundError(f"Dataset '{spec.name}' source is missing: {spec.source}")
+            print(f"Loading dataset {spec.name} from {spec.source}...")
+            df = reader(spec.source, **spec.read_options)
+
+        if spec.dtypes:
+            df = df.astype({c: t for c, t in spec.dtypes.items() if c in df.columns})
+        missing = [k for k in spec.join_keys if k not in df.columns]
+        if missing:
+            raise ValueError(f"Dataset '{spec.name}' missing join keys: {missing}")
+        if spec.transform is not None:
+            df = spec.transform(df)
+        return df
+
+    def _evict(self, keep: str = None):
+        while self.memory_bytes > self.max_bytes and len(self._frames) > 1:
+            oldest = next(iter(self._frames))
+            if oldest == keep:
+                break
+            self._drop(oldest)
+            self.stats["evictions"] += 1
+
+    def _drop(self, name: str):
+        self._frames.pop(name, None)
+        self._sizes.pop(name, None)
+
+    # --- Execution support ---
+    def referenced(self, code) -> list:
+        """Registered dataset names referenced by a code string or compiled code object."""
+        if isinstance(code, types.CodeType):
+            names = self._code_names(code)
+        else:
+            names = {node.id for node in ast.walk(ast.parse(code)) if isinstance(node, ast.Name)}
+        return [name for name in self.specs if name in names]
+
+    @classmethod
+    def _code_names(cls, code: types.CodeType) -> set:
+        names = set(code.co_names)
+        for const in code.co_consts:
+            if isinstance(const, types.CodeType):
+                names |= cls._code_names(const)
+        return names
+
+    def namespace(self, names: list) -> dict:
+        return {name: self.get(name) for name in names}
+
+    def columns(self) -> list:
+        """All declared columns plus the actual columns of currently loaded frames."""
+        columns = set()
+        for spec in self.specs.values():
+            columns.update(spec.columns)
+        for df in list(self._frames.values()):
+            columns.update(str(c) for c in df.columns)
+        return sorted(columns)
+
+    def schema_info(self) -> dict:
+        """Schema metadata for the planner prompt, generated from the dataset specs."""
+        schema = {}
+        for spec in self.specs.values():
+            schema[spec.name] = {"description": spec.description, "columns": spec.columns}
+            if spec.join_keys:
+                schema[spec.name]["join_keys"] = spec.join_keys
+        schema["relationships"] = {
+            spec.name: spec.relationship for spec in self.specs.values() if spec.relationship
+        }
+        return schema
+
+    def planner_hints(self) -> list:
+        return [hint for spec in self.specs.values() for hint in spec.hints]
+
+    def planner_example(self):
+        return next((spec.example for spec in self.specs.values() if spec.example), None)
+
+    def join_example(self):
+        """e.g. "df1.merge(df2, on='Patient_Number')" for the first two datasets sharing a join key."""
+        specs = list(self.specs.values())
+        for i, left in enumerate(specs):
+            for right in specs[i + 1:]:
+                shared = [k for k in left.join_keys if k in right.join_keys]
+                if shared:
+                    return f"{left.name}.merge({right.name}, on='{shared[0]}')"
+        return None
+
+    def sampled(self, n: int = 200, key: str = "Patient_Number", seed: int = 42):
+        """
+        Registry view restricted to a sample of `key` values (drawn from the first dataset
+        declaring that join key). Used for cheap trial executions.
+        """
+        sample = DatasetRegistry(self.max_bytes)
+        parent = self
+        state = {}
+
+        def sample_ids():
+            if "ids" not in state:
+                source = next(s.name for s in parent.specs.values() if key in s.join_keys)
+                values = pd.Series(parent.get(source)[key].unique())
+                state["ids"] = values.sample(n=min(n, len(values)), random_state=seed)
+            return state["ids"]
+
+        for spec in self.specs.values():
+            def loader(_, name=spec.name, keyed=key in spec.join_keys):
+                df = parent.get(name)
+                return df[df[key].isin(sample_ids())] if keyed else df
+            sample.register(DatasetSpec(spec.name, description=spec.description, columns=spec.columns,
+                                        join_keys=spec.join_keys, relationship=spec.relationship, loader=loader,
+                                        hints=spec.hints, example=spec.example))
+        return sample
+
+    # --- Construction ---
+    @classmethod
+    def from_catalog(cls, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Builds a registry from a JSON/YAML catalog:
+        {"datasets": [{"name", "source", "format", "description", "columns", "join_keys", "dtypes",
+                       "relationship", "hints", "example"}]}
+        Relative sources are resolved against the catalog's directory.
+        """
+        path = Path(path)
+        with open(path, "r", encoding="utf-8") as f:
+            if path.suffix in (".yaml", ".yml"):
+                import yaml
+                catalog = yaml.safe_load(f)
+            else:
+                catalog = json.load(f)
+        registry = cls(max_bytes)
+        for entry in catalog.get("datasets", []):
+            registry.register(DatasetSpec.from_dict(entry, base_dir=path.parent))
+        return registry
+
+    @staticmethod
+    def configured_catalog():
+        """Catalog path selected by `DATA_CATALOG` (config.settings, else the environment), or None."""
+        from config import settings
+        return getattr(settings, "DATA_CATALOG", None) or os.getenv("DATA_CATALOG") or None
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def default():
+        """
+        Shared registry: the configured catalog if DATA_CATALOG is set, otherwise the two
+        bundled health datasets and the activity feature store.
+        """
+        catalog = DatasetRegistry.configured_catalog()
+        if catalog:
+            print(f"Using dataset catalog {catalog}")
+            return DatasetRegistry.from_catalog(catalog)
+
+        from config.settings import DATASET_1_PATH, DATASET_2_PATH
+        from src.data.loader import DataLoader
+        from src.data.schema import DATASET_DESCRIPTIONS
+
+        registry = DatasetRegistry()
+        registry.register(DatasetSpec(
+            "df1", source=DATASET_1_PATH, transform=DataLoader._feature_engineering, **DATASET_DESCRIPTIONS["df1"]))
+        registry.register(DatasetSpec(
+            "df2", source=DATASET_2_PATH, **DATASET_DESCRIPTIONS["df2"]))
+        registry.register(DatasetSpec(
+            "df_features",
+            loader=lambda reg: DataLoader.load_or_build_features(reg.get("df2"), DATASET_2_PATH),
+            **DATASET_DESCRIPTIONS["df_features"]))
+        return registry
@@ -1,38 +1,81 @@
-def get_schema_info():
-    """
-    Returns schema metadata for LLM context.
-    Provides detailed column descriptions and value ranges/types.
-    """
-    return {
-        "df1": {
-            "description": "Patient Health Metrics (N=2000)",
-            "columns": {
-                "Patient_Number": "Unique ID for patient",
-                "Blood_Pressure_Abnormality": "0=Normal, 1=Abnormal",
-                "Level_of_Hemoglobin": "Hemoglobin level (g/dl)",
-                "Genetic_Pedigree_Coefficient": "Disease risk score (0-1)",
-                "Age": "Patient age in years",
-                "BMI": "Body Mass Index",
-                "Sex": "0=Male, 1=Female",
-                "Pregnancy": "0=No, 1=Yes",
-                "Smoking": "0=No, 1=Yes",
-                "salt_content_in_the_diet": "Daily salt intake (mg)",
-                "alcohol_consumption_per_day": "Daily alcohol intake (ml)",
-                "Level_of_Stress": "1=Low, 2=Normal, 3=High",
-                "Chronic_kidney_disease": "Target Variable: 0=No, 1=Yes",
-                "Adrenal_and_thyroid_disorders": "0=No, 1=Yes"
-            }
+# Planner-facing descriptions of the bundled datasets (registered in DatasetRegistry.default()).
+# Additional cohort extracts declare the same fields in a registry catalog file.
+DATASET_DESCRIPTIONS = {
+    "df1": {
+        "description": "Patient Health Metrics (N=2000)",
+        "columns": {
+            "Patient_Number": "Unique ID for patient",
+            "Blood_Pressure_Abnormality": "0=Normal, 1=Abnormal",
+            "Level_of_Hemoglobin": "Hemoglobin level (g/dl)",
+            "Genetic_Pedigree_Coefficient": "Disease risk score (0-1)",
+            "Age": "Patient age in years",
+            "BMI": "Body Mass Index",
+            "Sex": "0=Male, 1=Female",
+            "Pregnancy": "0=No, 1=Yes",
+            "Smoking": "0=No, 1=Yes",
+            "salt_content_in_the_diet": "Daily salt intake (mg)",
+            "alcohol_consumption_per_day": "Daily alcohol intake (ml)",
+            "Level_of_Stress": "1=Low, 2=Normal, 3=High",
+            "Chronic_kidney_disease": "Target Variable: 0=No, 1=Yes",
+            "Adrenal_and_thyroid_disorders": "0=No, 1=Yes",
+            "BMI_Category": "Derived (categorical): Underweight, Normal, Overweight, Obese"
         },
-        "df2": {
-            "description": "Physical Activity Data (N=20,000, 10 days per patient)",
-            "columns": {
-                "Patient_Number": "Foreign key to join with df1",
-                "Day_Number": "Day index (1-10)",
-                "Physical_activity": "Number of steps taken per day"
-            }
-        },
-        "relationships": {
-            "join_key": "Patient_Number",
-            "join_type": "One-to-Many (df1 has 1 record per patient, df2 has 10)"
+        "join_keys": ["Patient_Number"],
+        "relationship": "1 record per patient",
+        "hints": [
+            '"Perfect/Normal Hemoglobin": Male(13.8-17.2 g/dL), Female(12.1-15.1 g/dL). Use 12-17 as a general filter.',
+            '"Abnormal Blood Pressure": Use \'Blood_Pressure_Abnormality\' == 1.',
+            '"High Stress": Use \'Level_of_Stress\' == 3.',
+            '"Obese": BMI >= 30.',
+            '"Smoker": \'Smoking\' == 1.'
+        ],
+        "example": {
+            "question": "Find female smokers over 90",
+            "code": "result = df1[(df1['Sex'] == 1) & (df1['Smoking'] == 1) & (df1['Age'] > 90)]"
         }
+    },
+    "df2": {
+        "description": "Physical Activity Data (N=20,000, 10 days per patient)",
+        "columns": {
+            "Patient_Number": "Foreign key to join with df1",
+            "Day_Number": "Day index (1-10)",
+            "Physical_activity": "Number of steps taken per day"
+        },
+        "join_keys": ["Patient_Number"],
+        "relationship": "One-to-Many with df1 (10 records per patient)"
+    },
+    "df_features": {
+        "description": "Precomputed per-patient activity features from df2 (1 row per patient). Prefer this over aggregating df2.",
+        "columns": {
+            "Patient_Number": "Foreign key to join with df1",
+            "Days_Recorded": "Number of days with activity data",
+            "Mean_Steps": "Average steps per day",
+            "Median_Steps": "Median steps per day",
+            "Std_Steps": "Standard deviation of daily steps",
+            "Min_Steps": "Lowest daily steps",
+            "Max_Steps": "Highest daily steps",
+            "Total_Steps": "Sum of steps over all days",
+            "Days_Below_5000": "Days with fewer than 5000 steps (low activity days)",
+            "Days_Above_10000": "Days with 10000 or more steps (active days)",
+            "Activity_Trend_Slope": "Linear trend of steps over Day_Number (steps/day; negative = declining)",
+            "Coefficient_of_Variation": "Std_Steps / Mean_Steps (day-to-day variability)",
+            "Activity_Level": "Sedentary (<5000), Low_Active (5000-7499), Somewhat_Active (7500-9999), Active (>=10000) by Mean_Steps"
+        },
+        "join_keys": ["Patient_Number"],
+        "relationship": "One-to-One with df1 (1 record per patient)",
+        "hints": [
+            '"Low Physical Activity": df_features \'Mean_Steps\' < 5000 (Activity_Level == \'Sedentary\').',
+            "For per-patient activity statistics (average/total steps, low-activity days, trends), "
+            "use df_features instead of aggregating df2."
+        ]
     }
+}
+
+def get_schema_info(registry=None):
+    """
+    Returns schema metadata for LLM context.
+    Generated from the dataset registry (column descriptions, join keys, relationships).
+    """
+    from src.data.registry import DatasetRegistry
+    registry = registry if registry is not None else DatasetRegistry.default()
+    return registry.schema_info()
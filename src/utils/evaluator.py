@@ -3,6 +3,7 @@ import pandas as pd
 import numpy as np
 from rouge_score import rouge_scorer
 from src.utils.llm_client import GroqClient
+from src.utils.similarity import SemanticScorer
 
 class HealthEvaluator:
     """
@@ -11,22 +12,29 @@ class HealthEvaluator:
     METRICS OVERVIEW:
     1. G-Eval: LLM-as-a-judge for high-level qualitative scoring. (Use for: Professionalism, Safety, and Nuance)
     2. ROUGE: Lexical overlap comparison against reference. (Use for: Verification against known ground-truth text)
-    3. Semantic Score (BERT-like): Semantic similarity proxy using LLM. (Use for: Understanding if the 'meaning' is correct)
+    3. Semantic Score (BERT-like): Offline TF-IDF/BM25 cosine similarity (local embeddings if available). (Use for: Understanding if the 'meaning' is correct)
     4. Human Evaluation: Placeholder for manual review. (Use for: Gold standard validation and UX feedback)
     """
     
-    def __init__(self):
+    def __init__(self, references: list = None, similarity_method: str = "tfidf", embedding_model: str = None):
         self.llm = GroqClient()
         self.rouge_scorer = rouge_scorer.RougeScorer(['rouge1', 'rougeL'], use_stemmer=True)
+        self.semantic_scorer = SemanticScorer(references, method=similarity_method, model_name=embedding_model)
         
-    def evaluate(self, question: str, response: str, pipeline_result: dict, reference: str = None) -> dict:
+    def evaluate(self, question: str, response: str, pipeline_result: dict, reference: str = None,
+                 score_semantic: bool = True) -> dict:
         """
         Runs the expanded evaluation suite.
+        With score_semantic=False the semantic score is left to the caller (see run_semantic_batch).
         """
+        if not reference:
+            semantic = "N/A (No reference)"
+        else:
+            semantic = self.run_semantic_proxy(response, reference) if score_semantic else None
         eval_report = {
             "g_eval": self.run_g_eval(question, response),
             "rouge": self.run_rouge(response, reference) if reference else "N/A (No reference)",
-            "semantic_similarity": self.run_semantic_proxy(response, reference) if reference else "N/A (No reference)",
+            "semantic_similarity": semantic,
             "automated": self.run_automated_checks(response),
             "human_placeholder": self.get_human_evaluation_prompt(question, response)
         }
@@ -63,16 +71,16 @@ class HealthEvaluator:
             "rougeL_fmeasure": round(scores['rougeL'].fmeasure, 4)
         }
 
-    # --- 3. Semantic Similarity Proxy (BERT-like) ---
+    # --- 3. Semantic Similarity (BERT-like) ---
     # When to use: To check if the meaning matches a reference even if the wording is different.
+    # Scored locally (no LLM call), so results are reproducible and free of rate limits.
     def run_semantic_proxy(self, response: str, reference: str) -> float:
-        system_msg = "Measure the semantic similarity between two health responses on a scale of 0 to 1. 0 is completely different, 1 is identical meaning. Output ONLY the number."
-        prompt = f"Response A: {response}\nResponse B: {reference}"
-        score_raw = self.llm.generate(prompt, system_message=system_msg)
-        try:
-            return float(re.findall(r"0?\.\d+|1\.0|0", score_raw)[0])
-        except:
-            return 0.5
+        return round(self.semantic_scorer.score(response or "", reference), 4)
+
+    def run_semantic_batch(self, responses: list, references: list) -> list:
+        """Scores a whole evaluation batch in one matrix operation."""
+        scores = self.semantic_scorer.score_batch([r or "" for r in responses], references)
+        return [round(float(s), 4) for s in scores]
 
     # --- 4. Human Evaluation ---
     # When to use: For final deployment validation or to capture nuance LLMs might miss.
@@ -0,0 +1,48 @@
+import re
+import time
+from types import SimpleNamespace
+
+class FakeGroq:
+    """
+    Offline stand-in for `groq.Groq` exposing `chat.completions.create(...)`.
+    Per-model latency, failures and responses are scripted, so planner/hedging/serving paths
+    can be tested and load-tested without network access or API cost.
+
+    Usage:
+        GroqClient.use_client(FakeGroq(latencies={"slow-model": 2.0}, failures={"bad-model": "429 rate_limit"}))
+    """
+
+    DEFAULT_CODE = "result = df1['BMI'].mean()"
+
+    def __init__(self, responses: dict = None, latencies: dict = None, failures: dict = None,
+                 responder=None, default_latency: float = 0.0):
+        self.responses = responses or {}
+        self.latencies = latencies or {}
+        self.failures = failures or {}
+        self.responder = responder or self.default_responder
+        self.default_latency = default_latency
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, messages, model, **kwargs):
+        self.calls.append(model)
+        time.sleep(self.latencies.get(model, self.default_latency))
+        if model in self.failures:
+            raise RuntimeError(self.failures[model])
+
+        system, user = messages[0]["content"], messages[-1]["content"]
+        content = self.responses[model] if model in self.responses else self.responder(model, system, user)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=(len(system) + len(user)) // 4, completion_tokens=len(content) // 4)
+        )
+
+    @classmethod
+    def default_responder(cls, model, system_message, prompt):
+        """Plausible canned responses for each prompt type in the pipeline."""
+        if "DATASET SCHEMAS" in system_message or "You fix Python/Pandas code" in system_message:
+            return f"```python\n{cls.DEFAULT_CODE}\n```"
+        if re.search(r"Score the response 1-5", system_message):
+            return "4"
+        return ("Based on the data, the requested value was computed from the health dataset. "
+                "Disclaimer: this is educational information, not medical advice; consult a professional.")
@@ -1,66 +1,187 @@
 import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from groq import Groq
 from config.settings import GROQ_API_KEY, GROQ_MODEL, TEMPERATURE, MAX_TOKENS
 
 class GroqClient:
     """Wrapper for Groq API interactions"""
-    
+
     _instance = None
-    
+
+    # Triggers for failover to next model
+    FAILOVER_TRIGGERS = [
+        "rate_limit",
+        "429",
+        "decommissioned",
+        "not_found",
+        "model_not_found",
+        "503",
+        "service_unavailable"
+    ]
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(GroqClient, cls).__new__(cls)
-            cls._instance.client = Groq(api_key=GROQ_API_KEY)
+            cls._instance._client = None  # Built on first use, so use_client() never needs an API key
+            cls._instance.usage = {}
+            cls._instance._usage_lock = threading.Lock()
         return cls._instance
-    
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._usage_lock:
+                if self._client is None:
+                    self._client = Groq(api_key=GROQ_API_KEY)
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    @classmethod
+    def use_client(cls, client):
+        """Swaps the underlying client (e.g. a FakeGroq for offline tests and load tests)."""
+        instance = cls()
+        instance.client = client
+        return instance
+
+    def _complete(self, model, prompt, system_message):
+        """Single chat completion call with token/latency accounting."""
+        t_start = time.perf_counter()
+        chat_completion = self.client.chat.completions.create(
+            messages=[
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": prompt}
+            ],
+            model=model,
+            temperature=TEMPERATURE,
+            max_tokens=MAX_TOKENS,
+        )
+        self._record_usage(model, getattr(chat_completion, "usage", None), (time.perf_counter() - t_start) * 1000)
+        return chat_completion.choices[0].message.content
+
+    def _record_usage(self, model, usage, latency_ms, failed=False):
+        with self._usage_lock:
+            stats = self.usage.setdefault(model, {"calls": 0, "failures": 0, "prompt_tokens": 0,
+                                                  "completion_tokens": 0, "latency_ms": 0.0})
+            stats["calls"] += 1
+            stats["failures"] += int(failed)
+            stats["latency_ms"] += latency_ms
+            if usage is not None:
+                stats["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+                stats["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+
     def generate(self, prompt, system_message="You are a helpful assistant."):
         """
         Generates a response from Groq API with automatic failover for rate limits.
         """
         from config.settings import GROQ_FALLBACK_MODELS
         models_to_try = [GROQ_MODEL] + GROQ_FALLBACK_MODELS
-        
+
         last_error = None
-        
+
         for model in models_to_try:
             try:
-                chat_completion = self.client.chat.completions.create(
-                    messages=[
-                        {"role": "system", "content": system_message},
-                        {"role": "user", "content": prompt}
-                    ],
-                    model=model,
-                    temperature=TEMPERATURE,
-                    max_tokens=MAX_TOKENS,
-                )
-                return chat_completion.choices[0].message.content
+                return self._complete(model, prompt, system_message)
             except Exception as e:
                 last_error = e
+                self._record_usage(model, None, 0.0, failed=True)
                 err_msg = str(e).lower()
-                
-                # Triggers for failover to next model
-                failover_triggers = [
-                    "rate_limit", 
-                    "429", 
-                    "decommissioned", 
-                    "not_found", 
-                    "model_not_found",
-                    "503",
-                    "service_unavailable"
-                ]
-                
-                found_trigger = next((t for t in failover_triggers if t in err_msg), "error")
-                
-                if any(trigger in err_msg for trigger in failover_triggers):
+
+                found_trigger = next((t for t in self.FAILOVER_TRIGGERS if t in err_msg), "error")
+
+                if any(trigger in err_msg for trigger in self.FAILOVER_TRIGGERS):
                     print(f"⚠️ Failover trigger detected on {model}: {found_trigger}. Trying next fallback...")
                     continue
-                
+
                 # For other errors, log and return
                 print(f"❌ Groq API Error on {model}: {e}")
                 break
-                
+
         return f"ERROR_LLM_GEN_FAILED: {last_error}"
 
+    def generate_hedged(self, prompt, system_message="You are a helpful assistant.", accept=None,
+                        hedge_delay=0.5, models=None, usable=None):
+        """
+        Hedged generation: fires the primary model, then each fallback model after `hedge_delay`
+        seconds (0 = all at once), or immediately when an earlier request fails or is rejected.
+        The first response for which `accept(response)` is True wins; pending requests are cancelled
+        and late responses are ignored (but still counted in `usage`).
+        If no response is accepted, the highest-priority rejected response for which
+        `usable(response)` is True is returned instead (stats["winner"] marks it as a fallback).
+        Returns: (response, stats)
+        """
+        if models is None:
+            from config.settings import GROQ_FALLBACK_MODELS
+            models = [GROQ_MODEL] + GROQ_FALLBACK_MODELS
+        accept = accept or (lambda response: True)
+
+        t_start = time.perf_counter()
+        stats = {"launched": [], "rejected": [], "failed": [], "winner": None, "latency_ms": None}
+        pool = ThreadPoolExecutor(max_workers=len(models))
+        pending = {}
+        queue = list(models)
+
+        def launch():
+            model = queue.pop(0)
+            pending[pool.submit(self._complete, model, prompt, system_message)] = model
+            stats["launched"].append({"model": model, "at_ms": (time.perf_counter() - t_start) * 1000})
+
+        response = None
+        last_error = None
+        rejected = {}
+        next_launch = t_start
+        try:
+            while queue or pending:
+                now = time.perf_counter()
+                if queue and (not pending or now >= next_launch):
+                    launch()
+                    next_launch = time.perf_counter() + hedge_delay
+                    if hedge_delay <= 0:
+                        continue
+
+                timeout = max(next_launch - time.perf_counter(), 0) if queue else None
+                done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    model = pending.pop(future)
+                    try:
+                        candidate = future.result()
+                    except Exception as e:
+                        last_error = e
+                        self._record_usage(model, None, 0.0, failed=True)
+                        stats["failed"].append({"model": model, "error": str(e)})
+                        next_launch = time.perf_counter()
+                        continue
+                    if accept(candidate):
+                        response = candidate
+                        stats["winner"] = model
+                        break
+                    stats["rejected"].append(model)
+                    rejected[model] = candidate
+                    next_launch = time.perf_counter()
+                if response is not None:
+                    break
+        finally:
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        stats["latency_ms"] = (time.perf_counter() - t_start) * 1000
+        stats["cancelled"] = list(pending.values())
+        if response is None and usable is not None:
+            fallback = next((m for m in models if m in rejected and usable(rejected[m])), None)
+            if fallback is not None:
+                stats["winner"] = fallback
+                stats["fallback"] = True
+                return rejected[fallback], stats
+        if response is None:
+            reason = last_error or "no response passed acceptance"
+            return f"ERROR_LLM_GEN_FAILED: {reason}", stats
+        return response, stats
+
 if __name__ == "__main__":
     # verification
     try:
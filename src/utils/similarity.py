@@ -0,0 +1,209 @@
+import re
+import numpy as np
+
+class SemanticScorer:
+    """
+    Offline semantic similarity scorer for evaluation.
+    Uses vectorized TF-IDF / BM25 cosine similarity over a precomputed reference index.
+    If `sentence_transformers` and a local model are available, dense embeddings are used instead.
+    """
+
+    TOKEN_PATTERN = re.compile(r"[a-z]+|\d+(?:\.\d+)?")
+    STOPWORDS = frozenset([
+        'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have',
+        'in', 'is', 'it', 'its', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was',
+        'were', 'which', 'with', 'there', 'their', 'these', 'those', 'into', 'than'
+    ])
+    METHODS = ['tfidf', 'bm25']
+
+    def __init__(self, references: list = None, method: str = "tfidf", model_name: str = None,
+                 k1: float = 1.2, b: float = 0.75):
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown similarity method: {method}. Use one of {self.METHODS}")
+        self.method = method
+        self.k1 = k1
+        self.b = b
+        self.model = self._load_local_model(model_name) if model_name else None
+        self.backend = "embedding" if self.model is not None else method
+
+        self.vocab = {}
+        self.idf = np.zeros(0, dtype=np.float32)
+        self.oov_idf = 1.0
+        self.avg_doc_len = 1.0
+        self.ref_index = {}
+        self.ref_matrix = np.zeros((0, 0), dtype=np.float32)
+        self.ref_norms = np.zeros(0, dtype=np.float32)
+
+        if references:
+            self.fit(references)
+
+    @staticmethod
+    def _load_local_model(model_name: str):
+        """Loads a local sentence embedding model if the optional dependency is installed."""
+        try:
+            from sentence_transformers import SentenceTransformer
+            return SentenceTransformer(model_name, device="cpu")
+        except Exception as e:
+            print(f"⚠️ Local embedding model unavailable ({e}). Falling back to lexical scoring.")
+            return None
+
+    def tokenize(self, text: str) -> list:
+        if not text:
+            return []
+        return [t for t in self.TOKEN_PATTERN.findall(str(text).lower()) if t not in self.STOPWORDS]
+
+    # --- Index ---
+    def fit(self, references: list):
+        """
+        Builds the vocabulary, IDF weights and the reference index in one pass.
+        Reference vectors are precomputed so each scoring call only vectorizes the responses.
+        """
+        references = list(dict.fromkeys(r for r in references if r))
+        if self.model is not None:
+            self.ref_index = {ref: i for i, ref in enumerate(references)}
+            self.ref_matrix = self._embed(references)
+            return self
+
+        tokenized = [self.tokenize(ref) for ref in references]
+        self.vocab = {}
+        for tokens in tokenized:
+            for tok in tokens:
+                self.vocab.setdefault(tok, len(self.vocab))
+
+        n_docs = max(len(tokenized), 1)
+        counts = self._count_matrix(tokenized)
+        doc_freq = (counts > 0).sum(axis=0)
+        # Smoothed IDF; unseen terms get the weight of a term present in no reference
+        self.idf = (np.log((1 + n_docs) / (1 + doc_freq)) + 1).astype(np.float32)
+        self.oov_idf = float(np.log(1 + n_docs) + 1)
+        self.avg_doc_len = float(np.mean([len(t) for t in tokenized])) if tokenized else 1.0
+        if self.avg_doc_len == 0:
+            self.avg_doc_len = 1.0
+
+        doc_lens = np.array([len(t) for t in tokenized], dtype=np.float32)
+        self.ref_index = {ref: i for i, ref in enumerate(references)}
+        self.ref_matrix = self._weight(counts, doc_lens)
+        self.ref_norms = np.linalg.norm(self.ref_matrix, axis=1)
+        return self
+
+    def _count_matrix(self, tokenized: list) -> np.ndarray:
+        """Dense term-count matrix (docs x vocab) for in-vocabulary tokens."""
+        counts = np.zeros((len(tokenized), len(self.vocab)), dtype=np.float32)
+        rows, cols = [], []
+        for i, tokens in enumerate(tokenized):
+            for tok in tokens:
+                col = self.vocab.get(tok)
+                if col is not None:
+                    rows.append(i)
+                    cols.append(col)
+        if rows:
+            np.add.at(counts, (np.array(rows), np.array(cols)), 1)
+        return counts
+
+    def _weight(self, counts: np.ndarray, doc_lens: np.ndarray) -> np.ndarray:
+        """Applies TF-IDF or BM25 term weighting to a count matrix."""
+        if self.method == "bm25":
+            norm = self.k1 * (1 - self.b + self.b * doc_lens[:, None] / self.avg_doc_len)
+            tf = counts * (self.k1 + 1) / (counts + norm)
+        else:
+            tf = np.where(counts > 0, 1 + np.log(np.maximum(counts, 1)), 0)
+        return (tf * self.idf).astype(np.float32)
+
+    def _oov_weights(self, tokens: list, doc_len: float) -> dict:
+        """
+        Weights of out-of-vocabulary terms, using the frozen IDF of a term present in no reference.
+        They count towards the norm and only match the same unseen term on the other side of a pair.
+        """
+        oov = {}
+        for tok in tokens:
+            if tok not in self.vocab:
+                oov[tok] = oov.get(tok, 0) + 1
+        if not oov:
+            return {}
+        tf = np.array(list(oov.values()), dtype=np.float32)
+        if self.method == "bm25":
+            tf = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * doc_len / self.avg_doc_len))
+        else:
+            tf = 1 + np.log(tf)
+        return dict(zip(oov, (tf * self.oov_idf).tolist()))
+
+    def _vectorize(self, texts: list):
+        """Returns (weighted matrix, full norms, OOV weights) for texts against the fitted vocabulary."""
+        tokenized = [self.tokenize(t) for t in texts]
+        doc_lens = np.array([len(t) for t in tokenized], dtype=np.float32)
+        matrix = self._weight(self._count_matrix(tokenized), doc_lens)
+        oov = [self._oov_weights(t, l) for t, l in zip(tokenized, doc_lens)]
+        oov_sq = np.array([sum(w * w for w in o.values()) for o in oov], dtype=np.float32)
+        norms = np.sqrt(np.sum(matrix ** 2, axis=1) + oov_sq)
+        return matrix, norms, oov
+
+    def _embed(self, texts: list) -> np.ndarray:
+        return np.asarray(self.model.encode(list(texts), normalize_embeddings=True), dtype=np.float32)
+
+    # --- Scoring ---
+    def score(self, response: str, reference: str) -> float:
+        return float(self.score_batch([response], [reference])[0])
+
+    def score_batch(self, responses: list, references: list) -> np.ndarray:
+        """
+        Scores each response against its paired reference.
+        Returns an array of cosine similarities in [0, 1].
+        """
+        if len(responses) != len(references):
+            raise ValueError("responses and references must have the same length")
+        if not responses:
+            return np.zeros(0, dtype=np.float32)
+
+        texts = ['' if r is None else r for r in references]
+        valid = np.array([bool(r) for r in texts])
+        scores = np.zeros(len(responses), dtype=np.float32)
+        if not valid.any():
+            return scores
+
+        if self.model is not None:
+            resp_vecs = self._embed(['' if r is None else r for r in responses])
+            ref_vecs = self._embedded_references(texts)
+            sims = np.einsum('ij,ij->i', resp_vecs[valid], ref_vecs[valid])
+            scores[valid] = np.clip(sims, 0, 1)
+            return scores
+
+        resp_matrix, resp_norms, resp_oov = self._vectorize(responses)
+        ref_matrix, ref_norms, ref_oov = self._reference_vectors(texts)
+        dots = np.einsum('ij,ij->i', resp_matrix, ref_matrix)
+        # Unseen terms shared by a response and its (unindexed) reference
+        dots += np.array([sum(w * o[t] for t, w in r.items() if t in o) for r, o in zip(resp_oov, ref_oov)],
+                         dtype=np.float32)
+        denom = resp_norms * ref_norms
+        sims = np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+        scores[valid] = sims[valid]
+        return np.clip(scores, 0, 1)
+
+    def _reference_vectors(self, texts: list):
+        """
+        Row-aligned reference vectors, norms and OOV weights. Indexed references reuse the
+        precomputed rows; others are vectorized against the frozen vocabulary/IDF, so a score
+        never depends on call order or on which other references were seen.
+        """
+        missing = [r for r in dict.fromkeys(texts) if r not in self.ref_index]
+        extra = {}
+        if missing:
+            vectors, norms, oov = self._vectorize(missing)
+            extra = {r: (vectors[i], norms[i], oov[i]) for i, r in enumerate(missing)}
+
+        matrix = np.zeros((len(texts), len(self.vocab)), dtype=np.float32)
+        norms = np.zeros(len(texts), dtype=np.float32)
+        oov = []
+        for i, r in enumerate(texts):
+            if r in self.ref_index:
+                row = self.ref_index[r]
+                matrix[i], norms[i] = self.ref_matrix[row], self.ref_norms[row]
+                oov.append({})
+            else:
+                matrix[i], norms[i], weights = extra[r]
+                oov.append(weights)
+        return matrix, norms, oov
+
+    def _embedded_references(self, texts: list) -> np.ndarray:
+        missing = [r for r in dict.fromkeys(texts) if r not in self.ref_index]
+        extra = dict(zip(missing, self._embed(missing))) if missing else {}
+        return np.stack([self.ref_matrix[self.ref_index[r]] if r in self.ref_index else extra[r] for r in texts])
@@ -0,0 +1,120 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+def result_hash(df: pd.DataFrame):
+    """Content hash of a frame (values, index, columns). None if the frame is unhashable."""
+    try:
+        h = hashlib.sha1(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    except TypeError:
+        return None
+    h.update(repr((df.shape, [str(c) for c in df.columns], [str(t) for t in df.dtypes])).encode())
+    return h.hexdigest()
+
+class ResultSummarizer:
+    """
+    Builds a compact, token-bounded text encoding of query results for LLM prompts.
+    Small results are sent verbatim as CSV; larger ones are reduced to
+    describe()-style statistics, categorical value counts and the top rows that fit the budget.
+    """
+
+    CHARS_PER_TOKEN = 4
+    MAX_COLUMNS = 25
+    TOP_CATEGORIES = 5
+    # Compact formatting for describe() statistics only; result values are always sent exactly
+    STATS_FLOAT_FORMAT = "%.4g"
+
+    def __init__(self, token_budget: int = 1500, cache_size: int = 64):
+        self.token_budget = token_budget
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()  # Shared by concurrent pipeline runs (evaluation runner, API server)
+
+    def summarize(self, result) -> str:
+        """Returns the prompt representation of a result, cached per result hash."""
+        if isinstance(result, pd.Series):
+            result = result.to_frame(name=result.name if result.name is not None else "value")
+        if not isinstance(result, pd.DataFrame):
+            return self._truncate(str(result), self.token_budget * self.CHARS_PER_TOKEN)
+        if result.empty:
+            return "Empty DataFrame"
+
+        key = result_hash(result)
+        if key is not None:
+            with self._lock:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    return self._cache[key]
+
+        text = self._summarize_frame(result)
+
+        if key is not None:
+            with self._lock:
+                self._cache[key] = text
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return text
+
+    def _summarize_frame(self, df: pd.DataFrame) -> str:
+        budget = self.token_budget * self.CHARS_PER_TOKEN
+
+        # Column projection for wide (e.g. merged) frames
+        shown = df if df.shape[1] <= self.MAX_COLUMNS else df.iloc[:, :self.MAX_COLUMNS]
+        dropped = df.shape[1] - shown.shape[1]
+
+        # Every CSV row takes at least 2 chars, so only frames below budget // 2 rows can fit verbatim;
+        # larger frames are never serialized in full
+        if dropped == 0 and len(df) <= budget // 2:
+            full = self._to_csv(shown)
+            if len(full) <= budget:
+                return full
+
+        sections = [f"Shape: {df.shape[0]} rows x {df.shape[1]} columns"]
+        if dropped:
+            sections.append(f"(Showing first {self.MAX_COLUMNS} columns; {dropped} more omitted: "
+                            f"{', '.join(map(str, df.columns[self.MAX_COLUMNS:]))})")
+
+        numeric = shown.select_dtypes(include=[np.number, "bool"])
+        if not numeric.empty:
+            stats = numeric.astype(float).describe().T[["count", "mean", "std", "min", "50%", "max"]]
+            stats["count"] = stats["count"].astype(int)
+            sections.append("Numeric statistics:\n" + stats.to_csv(float_format=self.STATS_FLOAT_FORMAT).strip())
+
+        categorical = shown.select_dtypes(exclude=[np.number, "bool"])
+        if not categorical.empty:
+            lines = []
+            for col in categorical.columns:
+                counts = categorical[col].value_counts(dropna=False)
+                top = ", ".join(f"{k}={v}" for k, v in counts.head(self.TOP_CATEGORIES).items())
+                more = f" (+{len(counts) - self.TOP_CATEGORIES} more)" if len(counts) > self.TOP_CATEGORIES else ""
+                lines.append(f"{col}: {top}{more}")
+            sections.append("Value counts:\n" + "\n".join(lines))
+
+        header = "\n\n".join(sections)
+        remaining = budget - len(header) - 40
+        rows = self._rows_within(shown, remaining)
+        if rows:
+            header += f"\n\nFirst {rows.count(chr(10))} of {len(df)} rows:\n" + rows
+        return self._truncate(header, budget)
+
+    def _rows_within(self, df: pd.DataFrame, budget: int) -> str:
+        """Top-k rows as CSV, with k chosen so the text fits the remaining budget."""
+        if budget <= 0:
+            return ""
+        lines = self._to_csv(df.head(200)).splitlines()
+        out, used = [lines[0]], len(lines[0]) + 1
+        for line in lines[1:]:
+            if used + len(line) + 1 > budget:
+                break
+            out.append(line)
+            used += len(line) + 1
+        return "\n".join(out) if len(out) > 1 else ""
+
+    def _to_csv(self, df: pd.DataFrame) -> str:
+        return df.to_csv(index=not isinstance(df.index, pd.RangeIndex)).strip()
+
+    @staticmethod
+    def _truncate(text: str, limit: int) -> str:
+        return text if len(text) <= limit else text[:limit] + "\n... (truncated)"
@@ -1,46 +1,145 @@
 import re
 import ast
+import time
+import functools
+
+class SafetyVisitor(ast.NodeVisitor):
+    """
+    Single-pass AST visitor running all safety checks.
+    Stops at the first violation (stored in `violation`).
+    """
+
+    def __init__(self, allowed_imports, blocked_imports, blocked_calls, blocked_names, blocked_attributes=()):
+        self.allowed_imports = allowed_imports
+        self.blocked_imports = blocked_imports
+        self.blocked_attributes = set(blocked_imports) | set(blocked_attributes)
+        self.blocked_calls = blocked_calls
+        self.blocked_names = blocked_names
+        self.violation = None
+
+    def visit(self, node):
+        if self.violation is None:
+            super().visit(node)
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            self._check_import(alias.name)
+
+    def visit_ImportFrom(self, node):
+        # Relative imports have no module and are never allowed
+        self._check_import("." * node.level + (node.module or ""))
+
+    def _check_import(self, name):
+        # Allowlist: anything outside it (builtins, io, operator, ...) can reach the host
+        if name.split('.')[0] not in self.allowed_imports:
+            self.violation = f"Blocked import: {name}"
+
+    def visit_Call(self, node):
+        if isinstance(node.func, ast.Name) and node.func.id in self.blocked_calls:
+            self.violation = f"Blocked function call: {node.func.id}"
+            return
+        # Check for attribute calls (e.g., os.system)
+        if isinstance(node.func, ast.Attribute) and isinstance(node.func.value, ast.Name):
+            if node.func.value.id in self.blocked_imports:
+                self.violation = f"Blocked attribute call on: {node.func.value.id}"
+                return
+        self.generic_visit(node)
+
+    def visit_Attribute(self, node):
+        # Dunder access (e.g. ().__class__.__subclasses__()) escapes the sandbox
+        if node.attr.startswith('__'):
+            self.violation = f"Blocked dunder attribute access: {node.attr}"
+            return
+        # Private internals of allowed libraries (np.lib._datasource, df._mgr, ...)
+        if node.attr.startswith('_'):
+            self.violation = f"Blocked private attribute access: {node.attr}"
+            return
+        # Modules re-exported by allowed libraries (e.g. something.os.system, np.ctypeslib.ctypes)
+        if node.attr in self.blocked_attributes:
+            self.violation = f"Blocked attribute access: {node.attr}"
+            return
+        self.generic_visit(node)
+
+    def visit_Constant(self, node):
+        # Dunder names passed as strings (attrgetter("__class__"), df.eval("__import__..."))
+        if isinstance(node.value, str) and node.value.startswith('__'):
+            self.violation = f"Blocked dunder string: {node.value}"
+
+    def visit_Name(self, node):
+        if node.id in self.blocked_names or node.id.startswith('__'):
+            self.violation = f"Blocked name: {node.id}"
+            return
+        # Any reference to a blocked builtin, not only direct calls (e.g. `f = open; f(...)`)
+        if node.id in self.blocked_calls:
+            self.violation = f"Blocked function reference: {node.id}"
+            return
+        if node.id in self.blocked_imports:
+            self.violation = f"Blocked module reference: {node.id}"
 
 class QueryValidator:
     """
     Validates generated Python/Pandas code for safety.
     Prevents execution of dangerous operations using AST analysis and keyword blocking.
+    Parsing, validation and compilation happen once per distinct code string (LRU cached).
     """
     
-    BLOCKED_IMPORTS = ['os', 'sys', 'subprocess', 'shutil', 'pickle', 'importlib']
+    BLOCKED_IMPORTS = ['os', 'sys', 'subprocess', 'shutil', 'pickle', 'importlib', 'builtins', 'io']
     BLOCKED_CALLS = ['open', 'eval', 'exec', 'compile', 'input', 'exit', 'quit']
-    ALLOWED_MODULES = ['pd', 'np', 'pandas', 'numpy']
+    # Attribute names blocked on any object (module handles and file/process/pickle access)
+    BLOCKED_ATTRIBUTES = ['ctypes', 'ctypeslib', 'system', 'popen', 'open', 'read_pickle', 'to_pickle']
+    BLOCKED_NAMES = ['getattr', 'setattr', 'delattr', 'globals', 'locals', 'vars', 'breakpoint', '__import__', '__builtins__']
+    # Import allowlist (top-level package names); every other import is rejected
+    ALLOWED_MODULES = ['pandas', 'numpy', 'math', 'statistics', 'datetime']
+    CACHE_SIZE = 256
     
     @staticmethod
-    def validate(code: str) -> bool:
+    def validate(code: str) -> tuple:
         """
         Validates the provided code string.
         Returns: (is_safe: bool, reason: str)
         """
+        is_safe, reason, _ = QueryValidator.validate_and_compile(code)
+        return is_safe, reason
+
+    @staticmethod
+    def validate_and_compile(code: str) -> tuple:
+        """
+        Parses once, validates in a single AST pass and compiles the same tree.
+        Returns: (is_safe: bool, reason: str, code_object or None)
+        """
+        return QueryValidator._validate_and_compile_cached(code)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=CACHE_SIZE)
+    def _validate_and_compile_cached(code: str) -> tuple:
         try:
             tree = ast.parse(code)
         except SyntaxError:
-            return False, "Syntax Error in generated code"
-            
-        for node in ast.walk(tree):
-            # Check for imports
-            if isinstance(node, (ast.Import, ast.ImportFrom)):
-                for alias in node.names:
-                    if alias.name.split('.')[0] in QueryValidator.BLOCKED_IMPORTS:
-                        return False, f"Blocked import: {alias.name}"
-                        
-            # Check for function calls
-            if isinstance(node, ast.Call):
-                if isinstance(node.func, ast.Name):
-                    if node.func.id in QueryValidator.BLOCKED_CALLS:
-                        return False, f"Blocked function call: {node.func.id}"
-                # Check for attribute calls (e.g., os.system)
-                elif isinstance(node.func, ast.Attribute):
-                    if isinstance(node.func.value, ast.Name):
-                         if node.func.value.id in QueryValidator.BLOCKED_IMPORTS:
-                             return False, f"Blocked attribute call on: {node.func.value.id}"
-
-        return True, "Code is safe"
+            return False, "Syntax Error in generated code", None
+
+        visitor = SafetyVisitor(QueryValidator.ALLOWED_MODULES, QueryValidator.BLOCKED_IMPORTS,
+                                QueryValidator.BLOCKED_CALLS, QueryValidator.BLOCKED_NAMES,
+                                QueryValidator.BLOCKED_ATTRIBUTES)
+        visitor.visit(tree)
+        if visitor.violation:
+            return False, visitor.violation, None
+
+        try:
+            compiled = compile(tree, "<generated_query>", "exec")
+        except (SyntaxError, ValueError) as e:
+            return False, f"Compilation failed: {e}", None
+        return True, "Code is safe", compiled
+
+    @staticmethod
+    def timed_validate_and_compile(code: str) -> tuple:
+        """validate_and_compile plus elapsed milliseconds (near zero on a cache hit)."""
+        t_start = time.perf_counter()
+        is_safe, reason, compiled = QueryValidator.validate_and_compile(code)
+        return is_safe, reason, compiled, (time.perf_counter() - t_start) * 1000
+
+    @staticmethod
+    def cache_info():
+        return QueryValidator._validate_and_compile_cached.cache_info()
 
     @staticmethod
     def clean_code(llm_response: str) -> str:
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+class ResultRenderer:
+    """
+    Server-side helpers for displaying large query results.
+    Only a page of rows is sent to the browser, and charts are built from
+    aggregated (histogram bins) or downsampled (LTTB / random sample) data.
+    """
+
+    PAGE_SIZE = 100
+    MAX_SCATTER_POINTS = 5000
+    MAX_BARS = 50
+    HISTOGRAM_BINS = 50
+    RANDOM_SEED = 42
+
+    @staticmethod
+    def to_frame(result) -> pd.DataFrame:
+        if isinstance(result, pd.Series):
+            return result.to_frame(name=result.name if result.name is not None else "value")
+        return result
+
+    @staticmethod
+    def page(df: pd.DataFrame, page: int, page_size: int = PAGE_SIZE, columns: list = None) -> pd.DataFrame:
+        """Returns one page of rows (1-based page number), optionally projected to `columns`."""
+        if columns:
+            df = df[columns]
+        start = max(page - 1, 0) * page_size
+        return df.iloc[start:start + page_size]
+
+    @staticmethod
+    def page_count(n_rows: int, page_size: int = PAGE_SIZE) -> int:
+        return max(1, -(-n_rows // page_size))
+
+    # --- Downsampling ---
+    @staticmethod
+    def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+        """
+        Largest-Triangle-Three-Buckets downsampling.
+        Returns indices of the selected points; `x` must be sorted ascending.
+        """
+        n = len(x)
+        if threshold >= n or threshold < 3:
+            return np.arange(n)
+
+        selected = np.empty(threshold, dtype=np.int64)
+        selected[0], selected[-1] = 0, n - 1
+        edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+        a = 0
+        for i in range(threshold - 2):
+            start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+            # Average of the next bucket (or the last point for the final bucket)
+            nxt_start, nxt_end = end, edges[i + 2] if i + 2 < len(edges) else n
+            nxt_end = max(nxt_end, nxt_start + 1)
+            avg_x, avg_y = x[nxt_start:nxt_end].mean(), y[nxt_start:nxt_end].mean()
+
+            bx, by = x[start:end], y[start:end]
+            areas = np.abs((x[a] - avg_x) * (by - y[a]) - (x[a] - bx) * (avg_y - y[a]))
+            a = start + int(np.argmax(areas))
+            selected[i + 1] = a
+        return selected
+
+    @staticmethod
+    def downsample_scatter(df: pd.DataFrame, x: str, y: str, max_points: int = MAX_SCATTER_POINTS) -> pd.DataFrame:
+        """
+        Reduces a scatter input to at most `max_points` rows.
+        Uses LTTB when x is ordered (series-like data), a seeded random sample otherwise.
+        """
+        data = df[[x, y]].dropna()
+        if len(data) <= max_points:
+            return data
+        if data[x].is_monotonic_increasing:
+            idx = ResultRenderer.lttb(data[x].to_numpy(dtype=float), data[y].to_numpy(dtype=float), max_points)
+            return data.iloc[idx]
+        return data.sample(n=max_points, random_state=ResultRenderer.RANDOM_SEED)
+
+    @staticmethod
+    def histogram_bins(series: pd.Series, bins: int = HISTOGRAM_BINS) -> pd.DataFrame:
+        """Pre-aggregates a numeric column into bin centers and counts."""
+        values = series.dropna().to_numpy(dtype=float)
+        counts, edges = np.histogram(values, bins=bins)
+        return pd.DataFrame({
+            series.name: (edges[:-1] + edges[1:]) / 2,
+            "count": counts,
+        })
+
+    # --- Charts ---
+    @staticmethod
+    def build_chart(result):
+        """
+        Auto-selects and builds a plotly figure from aggregated/downsampled data.
+        Returns (figure, note) or (None, None) if no chart applies.
+        """
+        if isinstance(result, pd.Series):
+            # Large numeric Series of raw values (unnamed integer row index, e.g. df2["Physical_activity"]
+            # or a filtered column) are binned like a numeric column; labelled Series stay bars
+            unlabelled = result.index.nlevels == 1 and result.index.name is None \
+                and pd.api.types.is_integer_dtype(result.index)
+            if len(result) > ResultRenderer.MAX_BARS and unlabelled and pd.api.types.is_numeric_dtype(result) \
+                    and not pd.api.types.is_bool_dtype(result):
+                name = result.name if result.name is not None else "value"
+                data = ResultRenderer.histogram_bins(result.rename(name))
+                fig = px.bar(data, x=name, y="count", title=f"Distribution of {name}")
+                fig.update_layout(bargap=0)
+                return fig, f"Binned {len(result)} values into {len(data)} bins"
+            head = result.head(ResultRenderer.MAX_BARS)
+            # MultiIndex (multi-key groupby) levels are joined into one label, e.g. "Female / 1"
+            labels = [" / ".join(map(str, k)) if isinstance(k, tuple) else str(k) for k in head.index]
+            data = pd.DataFrame({"label": labels, "value": head.to_numpy()})
+            note = f"Showing first {ResultRenderer.MAX_BARS} of {len(result)} values" if len(result) > ResultRenderer.MAX_BARS else None
+            return px.bar(data, x="label", y="value", title=str(result.name or "")), note
+
+        if not isinstance(result, pd.DataFrame) or result.empty:
+            return None, None
+
+        num_cols = result.select_dtypes(include=['number']).columns.tolist()
+
+        if len(num_cols) >= 2:
+            data = ResultRenderer.downsample_scatter(result, num_cols[0], num_cols[1])
+            note = f"Downsampled to {len(data)} of {len(result)} points" if len(data) < len(result) else None
+            fig = px.scatter(data, x=num_cols[0], y=num_cols[1], title=f"{num_cols[0]} vs {num_cols[1]}")
+            return fig, note
+
+        if len(num_cols) == 1 and len(result.columns) == 2:
+            cat_col = [c for c in result.columns if c not in num_cols][0]
+            data = result
+            note = None
+            if len(result) > ResultRenderer.MAX_BARS:
+                data = result.nlargest(ResultRenderer.MAX_BARS, num_cols[0])
+                note = f"Showing top {ResultRenderer.MAX_BARS} of {len(result)} bars"
+            fig = px.bar(data, x=cat_col, y=num_cols[0], title=f"{num_cols[0]} by {cat_col}")
+            return fig, note
+
+        if len(num_cols) == 1:
+            data = ResultRenderer.histogram_bins(result[num_cols[0]])
+            fig = px.bar(data, x=num_cols[0], y="count", title=f"Distribution of {num_cols[0]}")
+            fig.update_layout(bargap=0)
+            return fig, None
+
+        return None, None
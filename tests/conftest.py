@@ -0,0 +1,17 @@
+import sys
+from pathlib import Path
+import pytest
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.utils.fake_llm import FakeGroq
+from src.utils.llm_client import GroqClient
+
+@pytest.fixture(autouse=True)
+def fake_llm():
+    """Every test runs against an offline FakeGroq (tests may install a scripted one)."""
+    client = FakeGroq()
+    GroqClient.use_client(client)
+    GroqClient().usage.clear()
+    return client
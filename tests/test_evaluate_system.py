@@ -0,0 +1,46 @@
+import json
+import pytest
+import scripts.evaluate_system as evaluate_system
+
+@pytest.fixture
+def suite(tmp_path):
+    path = tmp_path / "suite.jsonl"
+    path.write_text("".join(json.dumps({"id": str(i), "question": f"Average BMI {i}?",
+                                        "reference": "The average BMI computed from the health dataset is 27."}) + "\n"
+                            for i in range(5)))
+    return path
+
+def read_report(path):
+    return [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+
+def test_one_scored_line_per_item(suite, tmp_path, monkeypatch):
+    report = tmp_path / "report.jsonl"
+    totals = evaluate_system.run_evaluation(str(suite), str(report), workers=2)
+    entries = read_report(report)
+    assert sorted(e["id"] for e in entries) == ["0", "1", "2", "3", "4"]
+    assert all(isinstance(e["metrics"]["semantic_similarity"], float) for e in entries)
+    assert all("_semantic_pair" not in e for e in entries)
+    assert totals["items"] == 5 and totals["failed"] == 0
+
+def test_completed_items_are_on_disk_before_a_crash(suite, tmp_path, monkeypatch):
+    report = tmp_path / "report.jsonl"
+    original = evaluate_system.evaluate_item
+
+    def crash_on_third(pipeline, evaluator, item):
+        if item["id"] == "2":
+            raise RuntimeError("worker crashed")
+        return original(pipeline, evaluator, item)
+
+    monkeypatch.setattr(evaluate_system, "evaluate_item", crash_on_third)
+    with pytest.raises(RuntimeError):
+        evaluate_system.run_evaluation(str(suite), str(report), workers=1)
+    assert {"0", "1"} <= {e["id"] for e in read_report(report)}
+
+def test_resume_retries_failed_items(suite, tmp_path, monkeypatch):
+    report = tmp_path / "report.jsonl"
+    report.write_text(json.dumps({"id": "0", "pipeline": {"status": "success"}, "metrics": {}}) + "\n"
+                      + json.dumps({"id": "1", "pipeline": {"status": "error"}, "metrics": {}}) + "\n")
+    evaluate_system.run_evaluation(str(suite), str(report), workers=2, resume=True)
+    ids = [e["id"] for e in read_report(report)]
+    assert ids.count("0") == 1 and ids.count("1") == 2
+    assert set(evaluate_system.load_completed(report)) == {"0", "1", "2", "3", "4"}
@@ -0,0 +1,107 @@
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from src.core.planner import QueryPlanner
+from src.data.registry import DatasetRegistry, DatasetSpec
+from src.utils.fake_llm import FakeGroq
+from src.utils.llm_client import GroqClient
+
+MODELS = ["primary", "backup-1", "backup-2"]
+
+def code_block(code: str) -> str:
+    return f"```python\n{code}\n```"
+
+def hedged(fake: FakeGroq, **kwargs):
+    client = GroqClient.use_client(fake)
+    return client.generate_hedged("question", models=MODELS, **kwargs)
+
+# --- GroqClient.generate_hedged ---
+def test_fast_primary_wins_without_launching_backups():
+    fake = FakeGroq(responses={m: m for m in MODELS}, latencies={"primary": 0.01})
+    response, stats = hedged(fake, hedge_delay=0.5)
+    assert response == "primary" and stats["winner"] == "primary"
+    assert [l["model"] for l in stats["launched"]] == ["primary"]
+    assert fake.calls == ["primary"]
+
+def test_first_valid_response_wins_over_slow_primary():
+    fake = FakeGroq(responses={m: m for m in MODELS}, latencies={"primary": 1.0, "backup-1": 0.01, "backup-2": 1.0})
+    t_start = time.perf_counter()
+    response, stats = hedged(fake, hedge_delay=0.05)
+    assert response == "backup-1" and stats["winner"] == "backup-1"
+    assert time.perf_counter() - t_start < 0.5
+    assert "primary" in stats["cancelled"]
+
+def test_failure_launches_next_model_immediately():
+    fake = FakeGroq(responses={m: m for m in MODELS}, failures={"primary": "429 rate_limit"})
+    response, stats = hedged(fake, hedge_delay=5.0)
+    assert response == "backup-1"
+    assert stats["failed"][0]["model"] == "primary"
+    assert stats["launched"][1]["at_ms"] < 1000
+
+def test_rejected_response_launches_next_model():
+    fake = FakeGroq(responses={m: m for m in MODELS})
+    response, stats = hedged(fake, hedge_delay=5.0, accept=lambda r: r != "primary")
+    assert response == "backup-1"
+    assert stats["rejected"] == ["primary"]
+
+def test_nothing_accepted_falls_back_to_primary():
+    fake = FakeGroq(responses={m: m for m in MODELS})
+    response, stats = hedged(fake, hedge_delay=0, accept=lambda r: False, usable=lambda r: True)
+    assert response == "primary"
+    assert stats["fallback"] and stats["winner"] == "primary"
+
+def test_nothing_usable_is_an_error():
+    fake = FakeGroq(responses={m: m for m in MODELS})
+    response, stats = hedged(fake, hedge_delay=0, accept=lambda r: False, usable=lambda r: False)
+    assert response.startswith("ERROR_LLM_GEN_FAILED")
+    assert stats["winner"] is None
+
+def test_usage_accounts_for_every_call():
+    fake = FakeGroq(responses={m: "x" * 40 for m in MODELS}, failures={"primary": "503 service_unavailable"})
+    hedged(fake, hedge_delay=5.0)
+    usage = GroqClient().usage
+    assert usage["primary"]["calls"] == 1 and usage["primary"]["failures"] == 1
+    assert usage["backup-1"]["calls"] == 1 and usage["backup-1"]["failures"] == 0
+    assert usage["backup-1"]["completion_tokens"] == 10
+    assert "backup-2" not in usage
+
+# --- QueryPlanner in hedged mode ---
+@pytest.fixture
+def registry():
+    rng = np.random.default_rng(0)
+    registry = DatasetRegistry()
+    registry.register(DatasetSpec("df1", columns={"Patient_Number": "", "Age": ""}, join_keys=["Patient_Number"],
+                                  loader=lambda _: pd.DataFrame({"Patient_Number": np.arange(1, 2001),
+                                                                 "Age": rng.integers(20, 90, 2000)})))
+    return registry
+
+def planner_with(registry, responses, **latencies):
+    from config.settings import GROQ_MODEL, GROQ_FALLBACK_MODELS
+    models = [GROQ_MODEL] + GROQ_FALLBACK_MODELS
+    GroqClient.use_client(FakeGroq(responses=dict(zip(models, responses)), latencies=latencies))
+    return QueryPlanner(hedged=True, hedge_delay=0.05, sample_patients=50, registry=registry), models
+
+def test_id_specific_plan_is_not_rejected_on_the_sample(registry):
+    planner, models = planner_with(registry, [code_block("result = df1.loc[1999, 'Age']"),
+                                              code_block("result = df1['Age'].max()")])
+    plan = planner.generate_plan("age of patient 2000")
+    assert plan["error"] is None
+    assert plan["query_code"] == "result = df1.loc[1999, 'Age']"
+    assert plan["hedge_stats"]["winner"] == models[0]
+
+def test_schema_error_on_primary_lets_backup_win(registry):
+    planner, models = planner_with(registry, [code_block("result = df1['Agee'].max()"),
+                                              code_block("result = df1['Age'].max()")])
+    plan = planner.generate_plan("oldest age")
+    assert plan["query_code"] == "result = df1['Age'].max()"
+    assert plan["hedge_stats"]["rejected"] == [models[0]]
+
+def test_planning_failure_keeps_hedge_stats(registry):
+    from config.settings import GROQ_MODEL, GROQ_FALLBACK_MODELS
+    models = [GROQ_MODEL] + GROQ_FALLBACK_MODELS
+    GroqClient.use_client(FakeGroq(failures={m: "429 rate_limit" for m in models}))
+    planner = QueryPlanner(hedged=True, hedge_delay=0.05, sample_patients=50, registry=registry)
+    plan = planner.generate_plan("oldest age")
+    assert plan["error"].startswith("ERROR_LLM_GEN_FAILED")
+    assert [f["model"] for f in plan["hedge_stats"]["failed"]] == models
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+from src.core.executor import QueryExecutor
+from src.data.registry import DatasetRegistry, DatasetSpec
+
+@pytest.fixture
+def executor():
+    registry = DatasetRegistry()
+    registry.register(DatasetSpec("df1", join_keys=["Patient_Number"], loader=lambda _: pd.DataFrame({
+        "Patient_Number": [1, 2, 3, 4], "Age": [30, 45, 60, 75], "BMI": [22.0, 27.5, 31.0, 24.0]})))
+    registry.register(DatasetSpec("df2", join_keys=["Patient_Number"], loader=lambda _: pd.DataFrame({
+        "Patient_Number": [1, 1, 2, 3], "Physical_activity": [4000, 6000, 12000, 800]})))
+    return QueryExecutor(registry, instrument=True)
+
+def runs(executor, code, capsys):
+    capsys.readouterr()
+    outcome = executor.execute('print("RUN")\n' + code)
+    return capsys.readouterr().out.count("RUN"), outcome
+
+@pytest.mark.parametrize("code", [
+    "result = df1.Agee",
+    "result = df1.nope.mean()",
+    "x = df1.merge(df2, on='Patient_Number')\nresult = x.agee",
+    "result = pd.nothing(df1)",
+    "result = df1['Agee']",
+    "result = int(df1['Age'].mean()) / 0",
+    "result = df1['Age'].apply(lambda a: 1 / 0)",
+])
+def test_query_errors_run_once(executor, code, capsys):
+    count, outcome = runs(executor, code, capsys)
+    assert not outcome["success"]
+    assert count == 1
+
+def test_success_is_timed_without_fallback(executor, capsys):
+    count, outcome = runs(executor, "result = df1.loc[df1['Age'] > 40].merge(df2, on='Patient_Number')"
+                                    ".groupby('Patient_Number')['Physical_activity'].mean()", capsys)
+    assert count == 1 and outcome["success"]
+    metrics = outcome["metrics"]
+    assert not metrics["proxy_fallback"]
+    assert {"merge", "groupby"} <= set(metrics["ops"])
+    assert metrics["result_bytes"] > 0
+    assert isinstance(outcome["result"], pd.Series)
+
+def test_cost_report_groups_by_pattern(executor):
+    for threshold in (30, 40, 50):
+        executor.execute(f"result = df1[df1['Age'] > {threshold}]['BMI'].mean()")
+    executor.execute("result = df2['Physical_activity'].sum()")
+    report = executor.cost_report.top(10)
+    assert sorted(r["executions"] for r in report) == [1, 3]
+
+def test_uninstrumented_execution_has_no_metrics(executor):
+    outcome = executor.execute("result = df1['Age'].max()", instrument=False)
+    assert outcome["success"] and "metrics" not in outcome
@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+from src.core.planner import QueryPlanner
+from src.data.registry import DatasetRegistry, DatasetSpec
+from src.utils.fake_llm import FakeGroq
+from src.utils.llm_client import GroqClient
+
+@pytest.fixture
+def prompts():
+    captured = []
+    GroqClient.use_client(FakeGroq(responder=lambda model, system, user: captured.append(system)
+                                   or "```python\nresult = 1\n```"))
+    return captured
+
+def cohort_registry():
+    registry = DatasetRegistry()
+    for name in ("cohort_a", "cohort_b"):
+        registry.register(DatasetSpec(name, columns={"Patient_Number": "Patient ID", "HbA1c": "Glycated hemoglobin"},
+                                      join_keys=["Patient_Number"], loader=lambda _: pd.DataFrame()))
+    return registry
+
+def test_catalog_prompt_only_mentions_catalog_datasets(prompts):
+    QueryPlanner(registry=cohort_registry()).generate_plan("average HbA1c")
+    prompt = prompts[-1]
+    assert "cohort_a.merge(cohort_b, on='Patient_Number')" in prompt
+    for name in ("df1", "df2", "df_features"):
+        assert name not in prompt
+
+def test_spec_hints_and_example_are_included(prompts):
+    registry = cohort_registry()
+    registry.specs["cohort_a"].hints = ['"Poor control": HbA1c >= 8.']
+    registry.specs["cohort_a"].example = {"question": "High HbA1c", "code": "result = cohort_a[cohort_a['HbA1c'] > 9]"}
+    QueryPlanner(registry=registry).generate_plan("poorly controlled patients")
+    prompt = prompts[-1]
+    assert '"Poor control": HbA1c >= 8.' in prompt
+    assert "result = cohort_a[cohort_a['HbA1c'] > 9]" in prompt
+
+def test_single_dataset_has_no_join_example(prompts):
+    registry = DatasetRegistry()
+    registry.register(DatasetSpec("labs", columns={"HbA1c": ""}, loader=lambda _: pd.DataFrame()))
+    QueryPlanner(registry=registry).generate_plan("mean HbA1c")
+    assert ".merge(" not in prompts[-1]
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+from src.core.executor import QueryExecutor
+from src.core.repair import PlanRepairer
+from src.data.registry import DatasetRegistry, DatasetSpec
+from src.utils.fake_llm import FakeGroq
+from src.utils.llm_client import GroqClient
+
+@pytest.fixture
+def repairer():
+    registry = DatasetRegistry()
+    registry.register(DatasetSpec("df1", columns={"Patient_Number": "", "Sex": "", "Age": "", "BMI": ""},
+                                  join_keys=["Patient_Number"], loader=lambda _: pd.DataFrame({
+        "Patient_Number": [1, 2, 3, 4], "Sex": [0, 1, 1, 0], "Age": [30, 45, 60, 75], "BMI": [22.0, 27.5, 31.0, 24.0]})))
+    return PlanRepairer(QueryExecutor(registry))
+
+def repair(repairer, code):
+    failed = repairer.executor.execute(code)
+    assert not failed["success"]
+    return repairer.repair("question", code, failed)
+
+def test_misspelled_column_is_fixed_locally(repairer):
+    out = repair(repairer, "result = df1['Agee'].max()")
+    assert out["success"] and out["exec_result"]["result"] == 75
+    assert out["attempts"][0]["stage"] == "local"
+
+def test_reset_index_conflict_keeps_group_keys(repairer):
+    out = repair(repairer, "result = df1.groupby('Sex')['Sex'].count().reset_index()")
+    result = out["exec_result"]["result"]
+    assert out["success"]
+    assert list(result.columns) == ["Sex", "Sex_count"]
+    assert result.set_index("Sex")["Sex_count"].to_dict() == {0: 2, 1: 2}
+
+def test_reset_index_conflict_on_dataframe(repairer):
+    out = repair(repairer, "x = df1.reset_index()\nresult = df1.groupby('Sex')[['Sex', 'Age']].max().reset_index()")
+    assert out["success"]
+    assert list(out["exec_result"]["result"].columns) == ["Sex", "Sex_max", "Age"]
+    assert "x = df1.reset_index()" in out["query_code"]
+
+def test_none_result_is_not_a_repair(repairer):
+    GroqClient.use_client(FakeGroq(responder=lambda *_: "```python\nresult = None\n```"))
+    out = repair(repairer, "result = df1['Nonexistent_Measure'].mean()")
+    assert not out["success"]
+    assert all(not a["success"] for a in out["attempts"])
+    assert any("did not assign 'result'" in (a.get("error") or "") for a in out["attempts"])
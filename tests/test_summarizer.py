@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+from src.utils.summarizer import ResultSummarizer
+
+def test_small_results_are_sent_verbatim_with_exact_values():
+    df = pd.DataFrame({"Total_Steps": [123456.0, 98765.0], "Mean_Steps": [12345.6, 9876.5]})
+    text = ResultSummarizer().summarize(df)
+    assert "123456.0" in text and "12345.6" in text
+    assert "e+" not in text
+
+def test_series_keeps_exact_value():
+    assert "1234567.0" in ResultSummarizer().summarize(pd.Series([1234567.0], name="Total"))
+
+def test_large_results_stay_within_budget():
+    df = pd.DataFrame(np.random.default_rng(0).random((50_000, 4)), columns=list("abcd"))
+    summarizer = ResultSummarizer(token_budget=500)
+    text = summarizer.summarize(df)
+    assert len(text) <= 500 * summarizer.CHARS_PER_TOKEN + len("\n... (truncated)")
+    assert "Shape: 50000 rows x 4 columns" in text
+    assert "Numeric statistics:" in text
+
+def test_top_rows_are_exact():
+    df = pd.DataFrame({"Patient_Number": range(5000), "Mean_Steps": [12345.6] * 5000})
+    text = ResultSummarizer(token_budget=300).summarize(df)
+    assert "0,12345.6" in text
+
+def test_summary_is_cached_per_content():
+    summarizer = ResultSummarizer()
+    df = pd.DataFrame({"a": [1, 2, 3]})
+    assert summarizer.summarize(df) is summarizer.summarize(df.copy())
@@ -0,0 +1,49 @@
+import pytest
+from src.utils.validator import QueryValidator
+
+SANDBOX_ESCAPES = [
+    # Blocked builtins bound to another name before the call
+    'e = exec\ne("imp" + "ort os; os.system(\'echo hi\')")',
+    'f = open\nresult = f("/etc/hostname").read()',
+    'fns = [open]\nresult = fns[0]("/etc/hostname").read()',
+    # Native code through numpy's ctypes bridge
+    'np.ctypeslib.ctypes.CDLL(None).system(b"touch /tmp/pwned")',
+    'c = np.ctypeslib\nresult = c.ctypes',
+    # Imports outside the allowlist
+    'import builtins\nbuiltins.open("/etc/hostname")',
+    'import io\nio.open("/etc/hostname")',
+    'from operator import attrgetter\nattrgetter("__class__")(df1)',
+    'from . import settings',
+    # Dunder and private attribute access
+    'result = ().__class__.__bases__[0].__subclasses__()',
+    'result = np.lib._datasource.open("/etc/hostname")',
+    'result = pd.read_pickle("/tmp/payload.pkl")',
+    'result = pd.io.common.os.system("id")',
+]
+
+SAFE_QUERIES = [
+    "result = df1['BMI'].mean()",
+    "import pandas as pd\nimport numpy as np\nresult = np.round(df1.groupby('Sex')['BMI'].mean(), 2)",
+    "result = df1.merge(df2, on='Patient_Number').groupby('Sex')['Physical_activity'].mean()",
+    "result = df1.loc[df1['Age'] > 50, ['Patient_Number', 'Age']].reset_index(drop=True)",
+    "import math\nresult = math.sqrt(df1['Age'].var())",
+]
+
+@pytest.mark.parametrize("code", SANDBOX_ESCAPES)
+def test_rejects_sandbox_escapes(code):
+    is_safe, reason = QueryValidator.validate(code)
+    assert not is_safe, f"accepted: {code!r}"
+    assert reason
+
+@pytest.mark.parametrize("code", SAFE_QUERIES)
+def test_accepts_regular_queries(code):
+    is_safe, reason = QueryValidator.validate(code)
+    assert is_safe, reason
+
+def test_compiled_code_is_cached_per_code_string():
+    code = "result = df1['Age'].max()"
+    first = QueryValidator.validate_and_compile(code)
+    assert QueryValidator.validate_and_compile(code) is first
+
+def test_syntax_error_is_reported():
+    assert QueryValidator.validate("result = (") == (False, "Syntax Error in generated code")
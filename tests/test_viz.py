@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+from src.utils.viz import ResultRenderer
+
+def test_large_numeric_series_is_binned():
+    steps = pd.Series(np.random.default_rng(0).integers(0, 20000, 20000), name="Physical_activity")
+    fig, note = ResultRenderer.build_chart(steps)
+    assert fig.layout.title.text == "Distribution of Physical_activity"
+    assert len(fig.data[0].x) == ResultRenderer.HISTOGRAM_BINS
+    assert "20000" in note
+
+def test_filtered_numeric_series_is_binned():
+    steps = pd.Series(np.arange(1000, dtype=float), name="steps")
+    fig, _ = ResultRenderer.build_chart(steps[steps > 10])
+    assert fig.layout.title.text == "Distribution of steps"
+
+def test_labelled_series_stays_bars():
+    by_patient = pd.Series(np.arange(200, dtype=float), index=pd.Index(range(200), name="Patient_Number"))
+    fig, note = ResultRenderer.build_chart(by_patient)
+    assert len(fig.data[0].x) == ResultRenderer.MAX_BARS
+    assert note.startswith("Showing first")
+
+def test_multiindex_series_labels_are_flattened():
+    df = pd.DataFrame({"Sex": [0, 1, 0, 1], "Smoking": [0, 0, 1, 1], "BMI": [22.0, 25.0, 28.0, 31.0]})
+    fig, _ = ResultRenderer.build_chart(df.groupby(["Sex", "Smoking"])["BMI"].mean())
+    assert list(fig.data[0].x) == ["0 / 0", "0 / 1", "1 / 0", "1 / 1"]
+
+def test_lttb_keeps_endpoints_and_size():
+    x = np.arange(10000, dtype=float)
+    idx = ResultRenderer.lttb(x, np.sin(x / 100), 500)
+    assert len(idx) == 500 and idx[0] == 0 and idx[-1] == 9999